@@ -0,0 +1,131 @@
+"""
+Бенчмарк анализа экрана: время и пиковая память (RSS) для полного кадра
+и для обработки полосами на синтетических кадрах разных разрешений.
+
+Каждый замер выполняется в отдельном процессе, чтобы пиковый RSS
+не смешивался между режимами.
+
+    uv run benchmarks/analyzer_benchmark.py
+    uv run benchmarks/analyzer_benchmark.py --sizes 7680x4320 --budget 128
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss() -> int:
+    """Пиковый RSS текущего процесса в байтах."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        )
+        return int(counters.PeakWorkingSetSize)
+
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def synthetic_frame(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Кадр, похожий на интерфейс: панели, кнопки и строки текста (BGRA)."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 4), 240, dtype=np.uint8)
+    for _ in range(width * height // 20000):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 20))
+        w, h = int(rng.integers(20, 200)), int(rng.integers(12, 40))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3)) + (255,)
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, -1 if rng.random() < 0.5 else 1)
+        if rng.random() < 0.5:
+            cv2.putText(img, "Button", (x + 2, y + h - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                        (0, 0, 0, 255), 1)
+    return img
+
+
+def run_single(width: int, height: int, mode: str, budget_mb: int) -> dict[str, object]:
+    """Один замер в текущем процессе."""
+    from vimouse.screen_analyzer import ScreenAnalyzer
+
+    img = synthetic_frame(width, height)
+    analyzer = ScreenAnalyzer()
+    analyzer.strip_mode = mode
+    analyzer.strip_memory_budget = budget_mb * 1024 * 1024
+
+    baseline = peak_rss()
+    started = time.perf_counter()
+    regions = analyzer.analyze_frame(img)
+    duration = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "size": f"{width}x{height}",
+        "seconds": round(duration, 3),
+        "peak_rss_delta_mb": round((peak_rss() - baseline) / 2**20, 1),
+        "regions": regions,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1920x1080,3840x2160,7680x4320")
+    parser.add_argument("--budget", type=int, default=128, help="бюджет памяти полос, МБ")
+    parser.add_argument("--single", help=argparse.SUPPRESS)  # mode:WxH для дочернего процесса
+    args = parser.parse_args()
+
+    if args.single:
+        mode, size = args.single.split(":")
+        width, height = (int(v) for v in size.split("x"))
+        print(json.dumps(run_single(width, height, mode, args.budget)))
+        return
+
+    print(f"{'size':>10} {'mode':>7} {'time, s':>8} {'peak RSS, MB':>13} {'regions':>8}")
+    for size in args.sizes.split(","):
+        results = {}
+        for mode in ("never", "always"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--single", f"{mode}:{size}", "--budget",
+                 str(args.budget)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results[mode] = result
+            label = "full" if mode == "never" else "strips"
+            print(f"{size:>10} {label:>7} {result['seconds']:>8} "
+                  f"{result['peak_rss_delta_mb']:>13} {len(result['regions']):>8}")
+        same = results["never"]["regions"] == results["always"]["regions"]
+        print(f"{size:>10} regions identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 ViMouse for Windows - Control mouse with keyboard using Vim-style shortcuts
 """
 
+import multiprocessing
 import os
 import sys
 from datetime import datetime
@@ -16,7 +17,8 @@ def main() -> None:
     # Настраиваем логирование в файл
     log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vimouse_debug.log")
     logger.remove()  # Удаляем стандартный обработчик
-    logger.add(log_path, rotation="1 MB", level="DEBUG")
+    # enqueue=True: запись в файл идет в фоновом потоке, а не в потоке опроса клавиатуры
+    logger.add(log_path, rotation="1 MB", level="DEBUG", enqueue=True)
 
     vimouse = None
     try:
@@ -48,4 +50,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # для процесса-анализатора в собранном exe
     main()
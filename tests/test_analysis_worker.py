@@ -0,0 +1,73 @@
+import os
+import signal
+import sys
+from collections.abc import Iterator
+
+import numpy as np
+import pytest
+
+from vimouse.analysis_worker import AnalysisWorker
+
+
+@pytest.fixture
+def worker() -> Iterator[AnalysisWorker]:
+    worker = AnalysisWorker(request_timeout=0.3, request_timeout_per_megapixel=0.0,
+                            ping_timeout=0.3, health_check_interval=0)
+    yield worker
+    worker.stop()
+
+
+def frame() -> np.ndarray:
+    return np.full((40, 60, 4), 200, dtype=np.uint8)
+
+
+def test_dead_process_falls_back_and_restarts(worker: AnalysisWorker) -> None:
+    worker.start()
+    process = worker._process
+    process.kill()
+    process.join(timeout=5.0)
+
+    assert worker.analyze(frame()) is None
+    assert worker.restarts == 1
+    assert worker._process is not process
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGSTOP недоступен")
+def test_timeout_falls_back_and_restarts(worker: AnalysisWorker) -> None:
+    worker.start()
+    process = worker._process
+    # Процесс жив, но не отвечает
+    os.kill(process.pid, signal.SIGSTOP)
+
+    assert worker.analyze(frame()) is None
+    assert worker.restarts == 1
+    assert worker._process is not process
+    assert not process.is_alive()
+
+
+def test_timeout_scales_with_frame_size() -> None:
+    worker = AnalysisWorker(request_timeout=5.0, request_timeout_per_megapixel=1.0)
+
+    small = worker.timeout_for(np.zeros((1080, 1920, 4), dtype=np.uint8))
+    large = worker.timeout_for(np.zeros((4320, 7680, 4), dtype=np.uint8))
+
+    assert small == pytest.approx(5.0 + 1920 * 1080 / 1e6)
+    assert large > small
+
+
+def test_restart_after_stop_keeps_one_monitor() -> None:
+    worker = AnalysisWorker(health_check_interval=30.0)
+    worker.start()
+    first_monitor = worker._monitor
+    worker.stop()
+
+    assert first_monitor is not None
+    assert not first_monitor.is_alive()
+
+    worker.start()
+    try:
+        assert worker._monitor is not None
+        assert worker._monitor is not first_monitor
+        assert worker._monitor.is_alive()
+    finally:
+        worker.stop()
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from vimouse.detection import (
+    MIN_STRIP_ROWS,
+    find_components,
+    find_components_by_strips,
+    strip_rows_for_budget,
+)
+
+
+def ui_frame(width: int = 640, height: int = 400, seed: int = 0) -> np.ndarray:
+    """Кадр, похожий на интерфейс: панели, кнопки и строки текста (BGRA)."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 4), 240, dtype=np.uint8)
+    for _ in range(60):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 20))
+        w, h = int(rng.integers(20, 200)), int(rng.integers(12, 40))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3)) + (255,)
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, -1 if rng.random() < 0.5 else 1)
+        if rng.random() < 0.5:
+            cv2.putText(img, "Button", (x + 2, y + h - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                        (0, 0, 0, 255), 1)
+    return img
+
+
+@pytest.mark.parametrize("strip_rows", [32, 100, 133, 333, 400])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_strips_match_full_frame(strip_rows: int, seed: int) -> None:
+    img = ui_frame(seed=seed)
+
+    gray, _, stats, centroids = find_components(img)
+    strip_gray, _, strip_stats, strip_centroids = find_components_by_strips(
+        img, strip_rows, halo=16
+    )
+
+    # Строка 0 (фон) при обработке полосами не заполняется
+    np.testing.assert_array_equal(strip_gray, gray)
+    np.testing.assert_array_equal(strip_stats[1:], stats[1:])
+    np.testing.assert_allclose(strip_centroids[1:], centroids[1:], rtol=0, atol=1e-9)
+
+
+def test_strips_on_empty_frame() -> None:
+    img = np.full((120, 200, 4), 240, dtype=np.uint8)
+
+    _, _, stats, _ = find_components(img)
+    _, _, strip_stats, _ = find_components_by_strips(img, 32)
+
+    assert len(stats) == len(strip_stats) == 1
+
+
+def test_strip_rows_fit_budget() -> None:
+    width, height = 7680, 4320
+    rows = strip_rows_for_budget(width, height, 256 * 2**20, halo=16)
+
+    assert MIN_STRIP_ROWS <= rows < height
+    assert rows % 2 == 0
+    # Исходный кадр BGRA уже занимает больше 128 МБ
+    assert strip_rows_for_budget(width, height, 128 * 2**20, halo=16) == MIN_STRIP_ROWS
+
+
+def test_strip_rows_small_frame_uses_whole_height() -> None:
+    assert strip_rows_for_budget(640, 400, 256 * 2**20, halo=16) == 400
@@ -0,0 +1,84 @@
+import random
+import time
+
+from vimouse.label_tracker import LabelTracker
+
+LABELS = [f"{a}{b}" for a in "qwertyuiopasdfghjklzxcvbnm" for b in "qwertyuiopasdfghjklzxcvbnm"
+          if a != b][:400]
+
+
+def test_first_activation_uses_labels_in_order() -> None:
+    tracker = LabelTracker()
+    regions = [(10, 10), (100, 10), (200, 10)]
+
+    targets = tracker.assign(regions, LABELS)
+
+    assert targets == dict(zip(LABELS, regions))
+
+
+def test_matched_targets_keep_labels() -> None:
+    tracker = LabelTracker(max_displacement=24)
+    first = tracker.assign([(100, 100), (300, 100), (500, 100)], LABELS)
+
+    # Порядок обнаружения изменился, элементы немного сдвинулись
+    second = tracker.assign([(502, 103), (98, 99), (300, 110)], LABELS)
+
+    assert second[LABELS[0]] == (98, 99)
+    assert second[LABELS[1]] == (300, 110)
+    assert second[LABELS[2]] == (502, 103)
+    assert set(first) == set(second)
+
+
+def test_displacement_beyond_limit_is_not_matched() -> None:
+    tracker = LabelTracker(max_displacement=24)
+    tracker.assign([(100, 100), (400, 400)], LABELS)
+
+    # Первый элемент уехал дальше порога, второй на месте
+    targets = tracker.assign([(400, 402), (160, 100)], LABELS)
+
+    assert targets[LABELS[1]] == (400, 402)
+    assert targets[LABELS[0]] == (160, 100)
+
+
+def test_nearest_candidate_wins() -> None:
+    tracker = LabelTracker(max_displacement=24)
+    tracker.assign([(100, 100)], LABELS)
+
+    targets = tracker.assign([(115, 100), (103, 100)], LABELS)
+
+    assert targets[LABELS[0]] == (103, 100)
+    assert targets[LABELS[1]] == (115, 100)
+
+
+def test_new_screen_gets_first_labels() -> None:
+    rng = random.Random(0)
+    tracker = LabelTracker()
+    tracker.assign([(rng.randrange(1920), rng.randrange(1080)) for _ in range(250)], LABELS)
+
+    # Другой экран: элементы в другой части, ни один не сопоставился
+    regions = [(3000 + 40 * i, 2000) for i in range(60)]
+    targets = tracker.assign(regions, LABELS)
+
+    assert sorted(LABELS.index(label) for label in targets) == list(range(60))
+
+
+def test_regions_beyond_label_count_are_dropped() -> None:
+    tracker = LabelTracker()
+
+    targets = tracker.assign([(i * 50, 0) for i in range(5)], LABELS[:3])
+
+    assert len(targets) == 3
+
+
+def test_matching_hundreds_of_targets_is_fast() -> None:
+    rng = random.Random(1)
+    tracker = LabelTracker()
+    regions = [(rng.randrange(1920), rng.randrange(1080)) for _ in range(400)]
+    tracker.assign(regions, LABELS)
+    moved = [(x + rng.randint(-3, 3), y + rng.randint(-3, 3)) for x, y in regions]
+
+    started = time.perf_counter()
+    tracker.assign(moved, LABELS)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.02  # требование: единицы миллисекунд
@@ -0,0 +1,164 @@
+import time
+from pathlib import Path
+
+import numpy as np
+
+from vimouse.profiles import (
+    ENGINE_AUTO,
+    ENGINE_LOCAL,
+    SIGNATURE_SIZE,
+    DetectionProfile,
+    Layout,
+    ProfileStore,
+)
+from vimouse.window_info import FakeWindowInfoProvider, WindowInfo
+
+SIZE = (1920, 1080)
+
+
+def signature(value: int = 100) -> np.ndarray:
+    return np.full((SIGNATURE_SIZE[1], SIGNATURE_SIZE[0]), value, dtype=np.uint8)
+
+
+def layout(value: int = 100, targets: dict[str, tuple[int, int]] | None = None) -> Layout:
+    return Layout(SIZE, signature(value), targets or {"qw": (10, 20)})
+
+
+def window(class_name: str, process_name: str) -> WindowInfo:
+    provider = FakeWindowInfoProvider(WindowInfo(1, class_name, process_name, (0, 0, 800, 600)))
+    info = provider.get_foreground()
+    assert info is not None
+    return info
+
+
+def test_app_keys_class_before_process() -> None:
+    assert window("#32770", "Notepad.exe").app_keys == ("#32770", "notepad.exe")
+    assert window("", "Notepad.exe").app_keys == ("notepad.exe",)
+
+
+def test_select_prefers_dialog_class() -> None:
+    store = ProfileStore()
+
+    profile = store.select(window("#32770", "chrome.exe").app_keys)
+
+    assert profile is not None
+    assert profile.app_key == "#32770"
+    assert profile.engine == ENGINE_LOCAL
+    assert profile.params["max_regions_count"] == 80
+
+
+def test_select_falls_back_to_process() -> None:
+    store = ProfileStore()
+
+    known = store.select(window("Chrome_WidgetWin_1", "chrome.exe").app_keys)
+    unknown = store.select(window("SomeClass", "tool.exe").app_keys)
+
+    assert known is not None and known.app_key == "chrome.exe"
+    assert unknown is not None and unknown.app_key == "tool.exe"
+    assert unknown.engine == ENGINE_AUTO
+    assert unknown.params == {}
+    assert store.select(()) is None
+
+
+def test_lru_evicts_least_recent_app() -> None:
+    store = ProfileStore(max_apps=2)
+
+    store.get("a.exe")
+    store.get("b.exe")
+    store.get("a.exe")
+    store.get("c.exe")
+
+    assert list(store.profiles) == ["a.exe", "c.exe"]
+
+
+def test_layouts_bounded_newest_first() -> None:
+    profile = DetectionProfile("a.exe")
+
+    for value in (10, 20, 30):
+        profile.add_layout(layout(value), max_layouts=2)
+
+    assert [int(item.signature[0, 0]) for item in profile.layouts] == [30, 20]
+
+
+def test_add_layout_replaces_matched() -> None:
+    profile = DetectionProfile("a.exe")
+    old = layout(100)
+    profile.add_layout(old, max_layouts=4)
+
+    profile.add_layout(layout(101, {"as": (1, 2)}), max_layouts=4, replace=old)
+
+    assert len(profile.layouts) == 1
+    assert profile.layouts[0].targets == {"as": (1, 2)}
+
+
+def test_find_layout_per_cell_tolerance() -> None:
+    profile = DetectionProfile("a.exe")
+    profile.add_layout(layout(100), max_layouts=4)
+
+    close = signature(100)
+    close[:, :] = 106  # вся миниатюра немного светлее
+    dialog = signature(100)
+    dialog[10:20, 20:40] = 109  # небольшой диалог: мало ячеек, но сильно
+
+    assert profile.find_layout(SIZE, close, tolerance=8) is not None
+    assert profile.find_layout(SIZE, dialog, tolerance=8) is None
+    # Средняя разница по всей миниатюре мала, но совпадения быть не должно
+    assert float(np.abs(dialog.astype(int) - 100).mean()) < 1
+    assert profile.find_layout((1280, 720), signature(100), tolerance=8) is None
+
+
+def test_find_layout_moves_match_to_front() -> None:
+    profile = DetectionProfile("a.exe")
+    profile.add_layout(layout(10), max_layouts=4)
+    profile.add_layout(layout(200), max_layouts=4)
+
+    found = profile.find_layout(SIZE, signature(10), tolerance=8)
+
+    assert found is profile.layouts[0]
+
+
+def test_json_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "profiles.json"
+    store = ProfileStore(str(path))
+    profile = store.get("#32770")
+    profile.add_layout(layout(42, {"qw": (10, 20), "as": (30, 40)}), store.max_layouts)
+    store.save()
+
+    loaded = ProfileStore(str(path)).get("#32770")
+
+    assert loaded.params == profile.params
+    assert loaded.engine == profile.engine
+    assert len(loaded.layouts) == 1
+    assert loaded.layouts[0].size == SIZE
+    assert loaded.layouts[0].targets == {"qw": (10, 20), "as": (30, 40)}
+    np.testing.assert_array_equal(loaded.layouts[0].signature, signature(42))
+
+
+def test_save_later_is_debounced(tmp_path: Path) -> None:
+    path = tmp_path / "profiles.json"
+    store = ProfileStore(str(path), save_delay=0.05)
+    store.get("a.exe")
+
+    store.save_later()
+    store.save_later()
+    assert not path.exists()
+
+    deadline = time.monotonic() + 2.0
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert path.exists()
+
+
+def test_flush_writes_pending_changes(tmp_path: Path) -> None:
+    path = tmp_path / "profiles.json"
+    store = ProfileStore(str(path), save_delay=60.0)
+
+    store.flush()
+    assert not path.exists()  # нечего записывать
+
+    store.get("a.exe")
+    store.save_later()
+    store.flush()
+
+    assert path.exists()
+    assert "a.exe" in ProfileStore(str(path)).profiles
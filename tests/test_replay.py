@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import numpy as np
+
+from vimouse.recorder import EVENT_KEY, EVENT_MOUSE, EVENT_OVERLAY, InputRecorder
+from vimouse.replay import ReplayDriver
+
+VK_MENU = 0x12
+VK_BACKSLASH = 0xDC
+
+
+class _Recording:
+    """Запись, собранная вручную: фронты из хука на виртуальных часах."""
+
+    def __init__(self) -> None:
+        self.recorder = InputRecorder()
+        self.t = 100.0
+
+    def key(self, vk_code: int, down: bool, after: float) -> None:
+        self.t += after
+        self.recorder.record(EVENT_KEY, t=self.t, vk=vk_code, down=down, source="hook")
+
+    def tap(self, char: str, after: float, hold: float = 0.05) -> None:
+        self.key(ord(char), True, after)
+        self.key(ord(char), False, hold)
+
+
+def hook_recording() -> InputRecorder:
+    rec = _Recording()
+    # Alt + \ - оверлей показывается 0.3 с (анализ экрана)
+    rec.key(VK_MENU, True, 0.0)
+    rec.key(VK_BACKSLASH, True, 0.013)
+    rec.recorder.record(
+        EVENT_OVERLAY, t=rec.t, visible=True, targets={"qw": [10, 20], "as": [30, 40]},
+        duration=0.3,
+    )
+    rec.key(VK_BACKSLASH, False, 0.05)
+    rec.key(VK_MENU, False, 0.01)
+    # Нажато, пока опрос заблокирован показом оверлея: теряется
+    rec.tap("A", 0.05)
+    # Короче шага опроса: теряется
+    rec.tap("A", 0.4, hold=0.004)
+    # Допустимая метка
+    rec.tap("Q", 0.2)
+    rec.tap("W", 0.1)
+    return rec.recorder
+
+
+def test_dump_load_round_trip(tmp_path: Path) -> None:
+    recorder = InputRecorder(record_frames=True)
+    recorder.record(EVENT_KEY, t=1.5, vk=VK_MENU, down=True, source="hook")
+    recorder.record(EVENT_OVERLAY, t=2.0, visible=True, targets={"qw": [1, 2]}, duration=0.1)
+    frame = np.arange(4 * 6 * 4, dtype=np.uint8).reshape(4, 6, 4)
+    frame_id = recorder.add_frame(frame)
+
+    path = recorder.dump(tmp_path / "rec.jsonl")
+    loaded = InputRecorder.load(path)
+
+    assert path.with_suffix(".npz").exists()
+    assert list(loaded) == list(recorder)
+    assert frame_id is not None
+    np.testing.assert_array_equal(loaded.get_frame(frame_id), frame)
+
+
+def test_frames_not_recorded_by_default() -> None:
+    recorder = InputRecorder()
+
+    assert recorder.add_frame(np.zeros((2, 2, 4), dtype=np.uint8)) is None
+    assert not recorder.frames
+
+
+def test_hook_replay_is_deterministic() -> None:
+    recording = hook_recording()
+
+    first = list(ReplayDriver(recording).replay_keyboard())
+    second = list(ReplayDriver(recording).replay_keyboard())
+
+    assert first == second
+    mouse = [data for _, kind, data in first if kind == EVENT_MOUSE]
+    # "as" не выбрана: оба нажатия A пропущены, как в живой сессии
+    assert mouse == [
+        {"action": "move", "x": 10, "y": 20},
+        {"action": "click", "button": "left"},
+    ]
+    overlays = [data["visible"] for _, kind, data in first if kind == EVENT_OVERLAY]
+    assert overlays == [True, False]
+
+
+def test_hook_edges_take_priority_over_poll_edges() -> None:
+    recording = hook_recording()
+    # Фронт из опроса без хука был бы нажатием, которого не было
+    recording.record(EVENT_KEY, t=100.5, vk=ord("S"), down=True, source="poll")
+
+    driver = ReplayDriver(recording)
+
+    assert driver.from_hook
+    assert ord("S") not in driver._edge_times
@@ -1,8 +1,16 @@
-from .vimouse import ViMouse
-
 """ViMouse - управление курсором с клавиатуры."""
 
 __version__ = "0.1.0"
 
 
 __all__ = ["ViMouse"]
+
+
+def __getattr__(name: str) -> object:
+    # Ленивый импорт: подмодули (например, в процессе-анализаторе)
+    # не должны тянуть за собой PyQt6
+    if name == "ViMouse":
+        from .vimouse import ViMouse
+
+        return ViMouse
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
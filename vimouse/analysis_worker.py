@@ -0,0 +1,237 @@
+import itertools
+import multiprocessing as mp
+import threading
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import numpy as np
+from loguru import logger
+
+
+def _worker_main(conn: Connection) -> None:
+    """
+    Точка входа процесса-анализатора.
+
+    Кадр читается напрямую из разделяемой памяти (без pickle пикселей),
+    обратно отправляется только массив координат (N, 2).
+    """
+    # Импорт здесь, а не в начале модуля: screen_analyzer сам импортирует этот модуль.
+    # Пакет vimouse импортирует ViMouse (и PyQt6) лениво, поэтому процесс его не грузит.
+    from .screen_analyzer import ScreenAnalyzer
+
+    analyzer = ScreenAnalyzer()
+    shm: SharedMemory | None = None
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+
+            command = message[0]
+            if command == "stop":
+                break
+            if command == "ping":
+                conn.send(("pong", message[1]))
+                continue
+            if command != "analyze":
+                continue
+
+            _, request_id, shm_name, shape, params = message
+            try:
+                if shm is None or shm.name != shm_name:
+                    if shm is not None:
+                        shm.close()
+                    shm = SharedMemory(name=shm_name)
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                for name, value in params.items():
+                    setattr(analyzer, name, value)
+                regions = analyzer.analyze_frame(frame)
+                del frame  # буфер shm нельзя закрыть, пока на него есть ссылки
+                conn.send(("ok", request_id, np.asarray(regions, dtype=np.int32).reshape(-1, 2)))
+            except Exception as e:
+                conn.send(("error", request_id, str(e)))
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class AnalysisWorker:
+    """
+    Анализ экрана в отдельном процессе, чтобы тяжелые циклы на Python/NumPy
+    не держали GIL главного процесса (Qt и поток клавиатуры).
+
+    Процесс запускается заранее (start), кадры передаются через
+    multiprocessing.shared_memory. При падении или зависании процесс
+    перезапускается, а вызывающий код получает None и анализирует сам.
+
+    Время ожидания ответа растет с размером кадра (request_timeout плюс
+    request_timeout_per_megapixel на каждый мегапиксель), чтобы медленный,
+    но работающий анализ 4K/8K не считался зависанием.
+    """
+
+    def __init__(
+        self,
+        request_timeout: float = 5.0,
+        request_timeout_per_megapixel: float = 1.0,
+        ping_timeout: float = 2.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        self.request_timeout = request_timeout
+        self.request_timeout_per_megapixel = request_timeout_per_megapixel
+        self.ping_timeout = ping_timeout
+        self.health_check_interval = health_check_interval
+        self._ctx = mp.get_context("spawn")
+        self._process: Any = None
+        self._conn: Connection | None = None
+        self._shm: SharedMemory | None = None
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._stopped = threading.Event()
+        self._monitor: threading.Thread | None = None
+        self.restarts = 0
+
+    def start(self) -> None:
+        """Запускает процесс-анализатор (если он еще не запущен) и проверку здоровья."""
+        with self._lock:
+            self._start_locked()
+        if self._monitor is None and self.health_check_interval > 0:
+            self._stopped.clear()
+            self._monitor = threading.Thread(target=self._health_monitor, daemon=True)
+            self._monitor.start()
+
+    def _health_monitor(self) -> None:
+        """Фоновый поток: периодически проверяет процесс и перезапускает его."""
+        while not self._stopped.wait(self.health_check_interval):
+            self.ensure_healthy()
+
+    def _start_locked(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            return
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        self._process = process
+        self._conn = parent_conn
+        logger.debug(f"Analysis worker started (pid {process.pid})")
+
+    def _stop_locked(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.send(("stop",))
+            except (OSError, ValueError):
+                pass
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            self._process.join(timeout=1.0)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join(timeout=1.0)
+            self._process = None
+
+    def _restart_locked(self, reason: str) -> None:
+        logger.warning(f"Restarting analysis worker: {reason}")
+        self._stop_locked()
+        self.restarts += 1
+        self._start_locked()
+
+    def stop(self) -> None:
+        """Останавливает процесс и освобождает разделяемую память."""
+        # Сначала дожидаемся потока проверки, чтобы он не перезапустил процесс
+        # и не остался работать рядом с новым после повторного start()
+        self._stopped.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=self.ping_timeout + 2.0)
+            self._monitor = None
+        with self._lock:
+            self._stop_locked()
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+    def _receive(self, request_id: int, timeout: float) -> tuple[Any, ...] | None:
+        """Ждет ответ с нужным id, пропуская устаревшие ответы."""
+        assert self._conn is not None
+        while self._conn.poll(timeout):
+            response = self._conn.recv()
+            if response[1] == request_id:
+                return response
+        return None
+
+    def is_healthy(self) -> bool:
+        """Проверяет, что процесс жив и отвечает на ping."""
+        with self._lock:
+            return self._ping_locked()
+
+    def _ping_locked(self) -> bool:
+        if self._process is None or not self._process.is_alive() or self._conn is None:
+            return False
+        request_id = next(self._request_ids)
+        try:
+            self._conn.send(("ping", request_id))
+            return self._receive(request_id, self.ping_timeout) is not None
+        except (EOFError, OSError):
+            return False
+
+    def ensure_healthy(self) -> None:
+        """Перезапускает процесс, если он не отвечает."""
+        with self._lock:
+            if not self._ping_locked():
+                self._restart_locked("health check failed")
+
+    def _frame_buffer(self, nbytes: int) -> SharedMemory:
+        """Возвращает сегмент разделяемой памяти не меньше nbytes."""
+        if self._shm is None or self._shm.size < nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._shm = SharedMemory(create=True, size=nbytes)
+        return self._shm
+
+    def timeout_for(self, frame: np.ndarray) -> float:
+        """Время ожидания ответа для кадра данного размера (секунды)."""
+        megapixels = frame.shape[0] * frame.shape[1] / 1_000_000
+        return self.request_timeout + self.request_timeout_per_megapixel * megapixels
+
+    def analyze(
+        self,
+        frame: np.ndarray,
+        params: dict[str, Any] | None = None,
+    ) -> list[tuple[int, int]] | None:
+        """
+        Анализирует кадр в процессе-анализаторе.
+        Возвращает None, если процесс недоступен или не ответил вовремя.
+        """
+        with self._lock:
+            if self._process is None or not self._process.is_alive() or self._conn is None:
+                self._restart_locked("process is not running")
+                return None
+
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            shm = self._frame_buffer(frame.nbytes)
+            shared = np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf)
+            shared[...] = frame
+            del shared
+
+            request_id = next(self._request_ids)
+            try:
+                self._conn.send(("analyze", request_id, shm.name, frame.shape, params or {}))
+                response = self._receive(request_id, self.timeout_for(frame))
+            except (EOFError, OSError) as e:
+                self._restart_locked(f"connection lost: {e}")
+                return None
+
+            if response is None:
+                self._restart_locked("request timed out")
+                return None
+            if response[0] == "error":
+                logger.error(f"Analysis worker error: {response[2]}")
+                return None
+
+            candidates: np.ndarray = response[2]
+            return [(int(x), int(y)) for x, y in candidates]
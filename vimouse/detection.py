@@ -0,0 +1,247 @@
+"""
+Построение маски элементов и поиск компонент связности.
+
+Два режима с одинаковым результатом:
+- find_components: весь кадр целиком (быстро, но много памяти);
+- find_components_by_strips: кадр обрабатывается горизонтальными полосами
+  с перекрытием, компоненты склеиваются на границах полос. Пиковая память
+  ограничена высотой полосы.
+"""
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# Примерный рабочий объем на пиксель при обработке полосы:
+# две производные Собеля и модуль градиента во float64, временные массивы,
+# маски uint8 и метки int32
+STRIP_BYTES_PER_PIXEL = 64
+# Исходный кадр BGRA, полный кадр в оттенках серого и карта границ (uint8)
+# хранятся целиком
+PERSISTENT_BYTES_PER_PIXEL = 4 + 2
+MIN_STRIP_ROWS = 32
+
+# (gray, edges, stats, centroids) в формате cv2.connectedComponentsWithStats
+Components = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def gradient_magnitude(gray: np.ndarray) -> np.ndarray:
+    """Модуль градиента Собеля (float64)."""
+    sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+    sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+    return np.sqrt(sobelx**2 + sobely**2)
+
+
+def detection_mask(gray: np.ndarray, gradient: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Комбинирует нормированный градиент (uint8), адаптивную бинаризацию
+    и границы Кэнни. Возвращает (маска, границы).
+    """
+    # 2. Метод адаптивной бинаризации с меньшим размером окна
+    binary_adaptive = cv2.adaptiveThreshold(
+        gray,
+        255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY_INV,
+        9,
+        3,
+    )
+
+    # 3. Метод Кэнни с меньшими порогами
+    edges = cv2.Canny(gray, 15, 80)
+
+    # Комбинируем результаты
+    combined = cv2.bitwise_or(gradient, edges)
+    combined = cv2.bitwise_or(combined, binary_adaptive)
+
+    # Морфологические операции для улучшения результата
+    kernel = np.ones((2, 2), np.uint8)
+    combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
+    combined = cv2.morphologyEx(combined, cv2.MORPH_OPEN, kernel)
+    return combined, edges
+
+
+def find_components(img: np.ndarray) -> Components:
+    """Ищет компоненты связности по всему кадру (BGRA) за один проход."""
+    # Конвертируем в оттенки серого
+    gray = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+
+    # 1. Метод градиентов с меньшими порогами
+    gradient = gradient_magnitude(gray)
+    gradient = cv2.normalize(gradient, None, 0, 255, cv2.NORM_MINMAX)
+    gradient = np.uint8(gradient)
+
+    combined, edges = detection_mask(gray, gradient)
+
+    # Находим компоненты связности
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(combined)
+    return gray, edges, stats, centroids
+
+
+def strip_rows_for_budget(width: int, height: int, budget: int, halo: int) -> int:
+    """
+    Высота полосы, при которой обработка укладывается в бюджет памяти (байты).
+    Если бюджет меньше, чем нужно даже для MIN_STRIP_ROWS, возвращается
+    минимальная высота и пишется предупреждение.
+    """
+    available = budget - width * height * PERSISTENT_BYTES_PER_PIXEL
+    rows = available // max(1, width * STRIP_BYTES_PER_PIXEL) - 2 * halo
+    if rows < MIN_STRIP_ROWS and rows < height:
+        required = (
+            width * height * PERSISTENT_BYTES_PER_PIXEL
+            + width * (MIN_STRIP_ROWS + 2 * halo) * STRIP_BYTES_PER_PIXEL
+        )
+        logger.warning(
+            f"Strip memory budget {budget // 2**20} MB is too small for {width}x{height}, "
+            f"need at least {required // 2**20} MB; using {MIN_STRIP_ROWS}-row strips"
+        )
+    rows = int(min(height, max(MIN_STRIP_ROWS, rows)))
+    return rows + rows % 2  # четная высота, см. find_components_by_strips
+
+
+def _normalize_with_range(gradient: np.ndarray, low: float, high: float) -> np.ndarray:
+    """
+    Нормирует градиент полосы в 0..255 по диапазону всего кадра.
+
+    В массив добавляется служебная строка с low/high, чтобы cv2.normalize
+    посчитал ровно тот же масштаб, что и при обработке всего кадра.
+    """
+    padded = np.empty((gradient.shape[0] + 1, gradient.shape[1]), dtype=np.float64)
+    padded[0, :] = low
+    padded[0, -1] = high
+    padded[1:] = gradient
+    normalized = cv2.normalize(padded, None, 0, 255, cv2.NORM_MINMAX)
+    return np.uint8(normalized[1:])
+
+
+def find_components_by_strips(img: np.ndarray, strip_rows: int, halo: int = 16) -> Components:
+    """
+    Ищет компоненты связности, обрабатывая кадр полосами по strip_rows строк.
+
+    Каждая полоса расширяется на halo строк сверху и снизу, чтобы фильтры
+    (Собель, адаптивный порог, морфология) видели тот же контекст, что и при
+    обработке всего кадра. Компоненты соседних полос склеиваются по 8-связности
+    через систему непересекающихся множеств.
+
+    cv2 нумерует компоненты в порядке обхода блоков 2x2, поэтому полосы
+    начинаются с четных строк: тогда порядок "полоса, метка в полосе"
+    совпадает с нумерацией при обработке всего кадра.
+
+    Гистерезис Кэнни не локален и видит только halo строк соседней полосы,
+    поэтому карта границ может отличаться в единичных пикселях у стыков;
+    на найденные регионы это практически не влияет.
+    """
+    height, width = img.shape[:2]
+    strip_rows = max(2, strip_rows + strip_rows % 2)
+    bands = [(y0, min(height, y0 + strip_rows)) for y0 in range(0, height, strip_rows)]
+
+    # Проход 1: оттенки серого и глобальный диапазон градиента
+    gray = np.empty((height, width), dtype=np.uint8)
+    for y0, y1 in bands:
+        gray[y0:y1] = cv2.cvtColor(img[y0:y1], cv2.COLOR_BGRA2GRAY)
+
+    low, high = np.inf, -np.inf
+    for y0, y1 in bands:
+        h0, h1 = max(0, y0 - halo), min(height, y1 + halo)
+        core = gradient_magnitude(gray[h0:h1])[y0 - h0 : y1 - h0]
+        low = min(low, float(core.min()))
+        high = max(high, float(core.max()))
+        del core
+
+    # Проход 2: маска и компоненты по полосам
+    edges = np.empty((height, width), dtype=np.uint8)
+    band_stats: list[np.ndarray] = []  # left, top, width, height, area
+    band_sums: list[np.ndarray] = []  # сумма x, сумма y по пикселям
+    parent: list[int] = []
+    prev_last_row: np.ndarray | None = None
+    offset = 0
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for y0, y1 in bands:
+        h0, h1 = max(0, y0 - halo), min(height, y1 + halo)
+        band_gray = gray[h0:h1]
+        gradient = _normalize_with_range(gradient_magnitude(band_gray), low, high)
+        combined, band_edges = detection_mask(band_gray, gradient)
+        del gradient
+        edges[y0:y1] = band_edges[y0 - h0 : y1 - h0]
+        core = np.ascontiguousarray(combined[y0 - h0 : y1 - h0])
+        del combined, band_edges
+
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(core)
+        del core
+        n = count - 1  # без фона
+
+        stats = stats[1:].astype(np.int64)
+        stats[:, cv2.CC_STAT_TOP] += y0
+        areas = stats[:, cv2.CC_STAT_AREA]
+        # Суммы координат целочисленные, поэтому восстанавливаются точно
+        sums = np.rint(centroids[1:] * areas[:, None]).astype(np.int64)
+        sums[:, 1] += areas * y0
+        band_stats.append(stats)
+        band_sums.append(sums)
+        parent.extend(range(offset, offset + n))
+
+        # Глобальные номера компонент: метка полосы + смещение (0 - фон)
+        first_row = np.where(labels[0] > 0, labels[0].astype(np.int64) + offset, 0)
+        last_row = np.where(labels[-1] > 0, labels[-1].astype(np.int64) + offset, 0)
+        del labels
+
+        # Склеиваем с предыдущей полосой (8-связность)
+        if prev_last_row is not None:
+            pairs = []
+            for shift in (-1, 0, 1):
+                above = prev_last_row[max(0, -shift) : width - max(0, shift)]
+                below = first_row[max(0, shift) : width - max(0, -shift)]
+                touching = (above > 0) & (below > 0)
+                pairs.append(np.stack([above[touching], below[touching]], axis=1))
+            for a, b in np.unique(np.concatenate(pairs), axis=0):
+                root_a, root_b = find(int(a) - 1), find(int(b) - 1)
+                if root_a != root_b:
+                    # Корень - компонента с меньшим номером (раньше при обходе)
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        prev_last_row = last_row
+        offset += n
+
+    if offset == 0:
+        return gray, edges, np.zeros((1, 5), dtype=np.int32), np.zeros((1, 2))
+
+    all_stats = np.concatenate(band_stats)
+    all_sums = np.concatenate(band_sums)
+    roots = np.array([find(i) for i in range(offset)], dtype=np.int64)
+    unique_roots, index = np.unique(roots, return_inverse=True)
+    k = len(unique_roots)
+
+    left = all_stats[:, cv2.CC_STAT_LEFT]
+    top = all_stats[:, cv2.CC_STAT_TOP]
+    right = left + all_stats[:, cv2.CC_STAT_WIDTH]
+    bottom = top + all_stats[:, cv2.CC_STAT_HEIGHT]
+
+    merged_left = np.full(k, width, dtype=np.int64)
+    merged_top = np.full(k, height, dtype=np.int64)
+    merged_right = np.zeros(k, dtype=np.int64)
+    merged_bottom = np.zeros(k, dtype=np.int64)
+    merged_area = np.zeros(k, dtype=np.int64)
+    merged_sums = np.zeros((k, 2), dtype=np.int64)
+    np.minimum.at(merged_left, index, left)
+    np.minimum.at(merged_top, index, top)
+    np.maximum.at(merged_right, index, right)
+    np.maximum.at(merged_bottom, index, bottom)
+    np.add.at(merged_area, index, all_stats[:, cv2.CC_STAT_AREA])
+    np.add.at(merged_sums, index, all_sums)
+
+    # Строка 0 - фон, как у cv2.connectedComponentsWithStats (остается нулевой: фон не используется)
+    stats = np.zeros((k + 1, 5), dtype=np.int32)
+    stats[1:, cv2.CC_STAT_LEFT] = merged_left
+    stats[1:, cv2.CC_STAT_TOP] = merged_top
+    stats[1:, cv2.CC_STAT_WIDTH] = merged_right - merged_left
+    stats[1:, cv2.CC_STAT_HEIGHT] = merged_bottom - merged_top
+    stats[1:, cv2.CC_STAT_AREA] = merged_area
+    centroids = np.zeros((k + 1, 2), dtype=np.float64)
+    centroids[1:] = merged_sums / merged_area[:, None]
+    return gray, edges, stats, centroids
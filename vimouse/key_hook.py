@@ -0,0 +1,172 @@
+import ctypes
+import threading
+from collections.abc import Callable
+from ctypes import wintypes
+
+from loguru import logger
+
+from .recorder import EVENT_KEY, InputRecorder
+
+WH_KEYBOARD_LL = 13
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+WM_QUIT = 0x0012
+
+VK_MENU = 0x12
+# Низкоуровневый хук сообщает левый и правый Alt отдельно,
+# а KeyboardHandler опрашивает общий код VK_MENU
+ALT_KEYS = (0xA4, 0xA5)  # VK_LMENU, VK_RMENU
+# Клавиши горячих сочетаний: Alt + "\", "]", J, K, Q
+HOTKEYS = frozenset((0xDC, 0xDD, ord("J"), ord("K"), ord("Q")))
+
+LRESULT = ctypes.c_ssize_t
+HOOKPROC = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+
+
+class KBDLLHOOKSTRUCT(ctypes.Structure):
+    _fields_ = [
+        ("vkCode", wintypes.DWORD),
+        ("scanCode", wintypes.DWORD),
+        ("flags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+user32 = ctypes.WinDLL("user32", use_last_error=True)
+kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+user32.SetWindowsHookExW.argtypes = (ctypes.c_int, HOOKPROC, wintypes.HINSTANCE, wintypes.DWORD)
+user32.SetWindowsHookExW.restype = wintypes.HHOOK
+user32.CallNextHookEx.argtypes = (wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+user32.CallNextHookEx.restype = LRESULT
+user32.UnhookWindowsHookEx.argtypes = (wintypes.HHOOK,)
+user32.GetMessageW.argtypes = (ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT,
+                               wintypes.UINT)
+user32.PostThreadMessageW.argtypes = (wintypes.DWORD, wintypes.UINT, wintypes.WPARAM,
+                                      wintypes.LPARAM)
+kernel32.GetModuleHandleW.argtypes = (wintypes.LPCWSTR,)
+kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+
+class KeyHook:
+    """
+    Записывает фронты клавиш через низкоуровневый хук клавиатуры.
+
+    KeyboardHandler видит клавиатуру только в моменты опроса (раз в 10 мс),
+    и не опрашивает ее, пока показывается оверлей. Хук работает в своем
+    потоке и получает каждое нажатие от системы, поэтому в записи остаются
+    и короткие нажатия, и нажатия во время анализа экрана. Такие события
+    помечаются source="hook" (фронты из опроса - source="poll").
+
+    Записываются только клавиши, которые опрашивает KeyboardHandler: Alt,
+    клавиши горячих сочетаний и буквы, пока виден оверлей, - обычный ввод
+    текста в другие приложения в запись не попадает. Хук выключен по
+    умолчанию и включается из меню в трее только на время отладки.
+    """
+
+    def __init__(
+        self,
+        recorder: InputRecorder,
+        overlay_visible: Callable[[], bool] = lambda: False,
+    ) -> None:
+        self.recorder = recorder
+        self.overlay_visible = overlay_visible
+        self._thread: threading.Thread | None = None
+        self._thread_id = 0
+        self._started = threading.Event()
+        self._down: set[int] = set()  # записанные нажатыми клавиши
+        self._alt_down: set[int] = set()  # нажатые левый/правый Alt
+        self._proc = HOOKPROC(self._callback)  # ссылка нужна, пока хук установлен
+
+    @property
+    def running(self) -> bool:
+        """Установлен ли хук."""
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Устанавливает хук в отдельном потоке."""
+        if self._thread is not None:
+            return
+        self._started.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=1.0)
+
+    def stop(self) -> None:
+        """Снимает хук и останавливает поток."""
+        if self._thread is None:
+            return
+        if self._thread_id:
+            user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        self._thread_id = 0
+        self._down.clear()
+        self._alt_down.clear()
+
+    def _run(self) -> None:
+        """Поток хука: хук вызывается только из цикла сообщений своего потока."""
+        self._thread_id = kernel32.GetCurrentThreadId()
+        hook = user32.SetWindowsHookExW(
+            WH_KEYBOARD_LL,
+            self._proc,
+            kernel32.GetModuleHandleW(None),
+            0,
+        )
+        self._started.set()
+        if not hook:
+            logger.error(f"Error installing keyboard hook: {ctypes.get_last_error()}")
+            return
+        logger.debug("Keyboard hook installed")
+
+        try:
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                pass
+        finally:
+            user32.UnhookWindowsHookEx(hook)
+            logger.debug("Keyboard hook removed")
+
+    def _callback(self, code: int, wparam: int, lparam: int) -> int:
+        """Обработчик хука: должен быстро вернуть управление системе."""
+        if code >= 0:
+            try:
+                info = ctypes.cast(lparam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
+                if wparam in (WM_KEYDOWN, WM_SYSKEYDOWN):
+                    self._update(int(info.vkCode), down=True)
+                elif wparam in (WM_KEYUP, WM_SYSKEYUP):
+                    self._update(int(info.vkCode), down=False)
+            except Exception as e:
+                logger.error(f"Error in keyboard hook: {e}")
+        return user32.CallNextHookEx(None, code, wparam, lparam)
+
+    def _is_relevant(self, vk_code: int) -> bool:
+        """Опрашивает ли эту клавишу KeyboardHandler (в текущем состоянии оверлея)."""
+        if vk_code in HOTKEYS:
+            return True
+        return ord("A") <= vk_code <= ord("Z") and self.overlay_visible()
+
+    def _update(self, vk_code: int, down: bool) -> None:
+        """Записывает фронт клавиши (автоповтор нажатия не записывается)."""
+        if vk_code in ALT_KEYS:
+            was_down = bool(self._alt_down)
+            if down:
+                self._alt_down.add(vk_code)
+            else:
+                self._alt_down.discard(vk_code)
+            if bool(self._alt_down) != was_down:
+                self.recorder.record(EVENT_KEY, vk=VK_MENU, down=not was_down, source="hook")
+            return
+
+        if down == (vk_code in self._down):
+            return
+        if down:
+            # Отпускание записывается всегда, если было записано нажатие
+            if not self._is_relevant(vk_code):
+                return
+            self._down.add(vk_code)
+        else:
+            self._down.discard(vk_code)
+        self.recorder.record(EVENT_KEY, vk=vk_code, down=down, source="hook")
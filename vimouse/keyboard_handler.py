@@ -1,19 +1,43 @@
 import os
 import threading
-from typing import cast
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, cast
 
-import win32api
-import win32con
 from loguru import logger
 
-from .mouse_controller import MouseController
-from .overlay import OverlayWindow
+from .recorder import EVENT_KEY, InputRecorder
+
+if TYPE_CHECKING:
+    # Оверлей и мышь нужны только для аннотаций: воспроизведение (replay.py)
+    # подставляет свои реализации и работает без Qt и Win32
+    from .mouse_controller import MouseController
+    from .overlay import OverlayWindow
+
+
+def _get_async_key_state(vk_code: int) -> int:
+    """Состояние клавиши из Win32 (модуль импортируется только при реальном опросе)."""
+    import win32api
+
+    return cast(int, win32api.GetAsyncKeyState(vk_code))
 
 
 class KeyboardHandler:
-    def __init__(self, overlay: OverlayWindow, mouse: MouseController) -> None:
+    def __init__(
+        self,
+        overlay: "OverlayWindow",
+        mouse: "MouseController",
+        recorder: InputRecorder | None = None,
+        key_state: Callable[[int], int] | None = None,
+        clock: Callable[[], float] = time.time,
+        autostart: bool = True,
+    ) -> None:
         self.overlay = overlay
         self.mouse = mouse
+        self.recorder = recorder
+        # Источник состояния клавиш (для воспроизведения подменяется записью)
+        self._key_state = key_state or _get_async_key_state
+        self.clock = clock
         self.running = False
         self.listener_thread: threading.Thread | None = None
         self.mask = 0x8000
@@ -24,20 +48,39 @@ class KeyboardHandler:
         self.waiting_for_release = False  # Ожидаем отпускания клавиши
 
         # Коды клавиш
+        self.VK_MENU = 0x12  # Alt
         self.VK_BACKSLASH = 0xDC  # Код клавиши "\"
+        self.VK_BRACKET = 0xDD  # Код клавиши "]"
         self.VK_J = ord("J")
         self.VK_K = ord("K")
         self.VK_Q = ord("Q")
 
+        self.prev_states = {
+            self.VK_BACKSLASH: False,
+            self.VK_BRACKET: False,
+            self.VK_J: False,
+            self.VK_K: False,
+            self.VK_Q: False,
+        }
+        # Последнее известное состояние клавиш для записи фронтов
+        self._recorded_states: dict[int, bool] = {}
+        self._now = 0.0
+
         # Инициализация обработчиков клавиатуры
-        self.start()
+        if autostart:
+            self.start()
+
+    def _is_key_down(self, vk_code: int) -> bool:
+        """Проверяет, нажата ли клавиша. Фронты пишутся в recorder."""
+        down = bool(self._key_state(vk_code) & self.mask)
+        if self.recorder is not None and self._recorded_states.get(vk_code, False) != down:
+            self._recorded_states[vk_code] = down
+            self.recorder.record(EVENT_KEY, t=self._now, vk=vk_code, down=down, source="poll")
+        return down
 
     def _check_hotkey(self, vk_code: int) -> bool:
         """Проверяет нажатие горячей клавиши (Alt + клавиша)."""
-        return bool(
-            cast(int, win32api.GetAsyncKeyState(win32con.VK_MENU)) & self.mask
-            and cast(int, win32api.GetAsyncKeyState(vk_code)) & self.mask,
-        )
+        return self._is_key_down(self.VK_MENU) and self._is_key_down(vk_code)
 
     def _check_overlay_key(self, vk_code: int) -> bool:
         """Проверяет, является ли нажатая клавиша буквой для оверлея."""
@@ -53,95 +96,103 @@ class KeyboardHandler:
 
     def _keyboard_listener(self) -> None:
         """Поток прослушивания клавиатуры."""
-        import time
+        import win32api
 
-        prev_states = {
-            self.VK_BACKSLASH: False,
-            self.VK_J: False,
-            self.VK_K: False,
-            self.VK_Q: False,
+        while self.running:
+            self.poll(self.clock())
+            win32api.Sleep(10)  # задержка для снижения нагрузки на CPU
+
+    def poll(self, current_time: float) -> None:
+        """Один шаг опроса клавиатуры на момент current_time."""
+        self._now = current_time
+
+        # Клавиши, записанные нажатыми, опрашиваются всегда: ниже они могут
+        # не проверяться (Alt не нажат, оверлей скрыт), и отпускание потерялось бы
+        if self.recorder is not None:
+            for vk_code in [vk for vk, down in self._recorded_states.items() if down]:
+                self._is_key_down(vk_code)
+
+        # Проверяем горячие клавиши
+        current_states = {
+            self.VK_BACKSLASH: self._check_hotkey(self.VK_BACKSLASH),
+            self.VK_BRACKET: self._check_hotkey(self.VK_BRACKET),
+            self.VK_J: self._check_hotkey(self.VK_J),
+            self.VK_K: self._check_hotkey(self.VK_K),
+            self.VK_Q: self._check_hotkey(self.VK_Q),
         }
+        prev_states = self.prev_states
 
-        while self.running:
-            current_time = time.time()
-
-            # Проверяем горячие клавиши
-            current_states = {
-                self.VK_BACKSLASH: self._check_hotkey(self.VK_BACKSLASH),
-                self.VK_J: self._check_hotkey(self.VK_J),
-                self.VK_K: self._check_hotkey(self.VK_K),
-                self.VK_Q: self._check_hotkey(self.VK_Q),
-            }
-
-            # Обрабатываем нажатия горячих клавиш
-            if current_states[self.VK_BACKSLASH] and not prev_states[self.VK_BACKSLASH]:
-                self.waiting_for_release = False
-                self._toggle_overlay()
-            if current_states[self.VK_J] and not prev_states[self.VK_J]:
-                self.waiting_for_release = False
-                self.mouse.scroll_down()
-            if current_states[self.VK_K] and not prev_states[self.VK_K]:
-                self.waiting_for_release = False
-                self.mouse.scroll_up()
-            if current_states[self.VK_Q] and not prev_states[self.VK_Q]:
+        # Обрабатываем нажатия горячих клавиш
+        if current_states[self.VK_BACKSLASH] and not prev_states[self.VK_BACKSLASH]:
+            self.waiting_for_release = False
+            self._toggle_overlay()
+        if current_states[self.VK_BRACKET] and not prev_states[self.VK_BRACKET]:
+            self.waiting_for_release = False
+            self._toggle_overlay(active_window=True)
+        if current_states[self.VK_J] and not prev_states[self.VK_J]:
+            self.waiting_for_release = False
+            self.mouse.scroll_down()
+        if current_states[self.VK_K] and not prev_states[self.VK_K]:
+            self.waiting_for_release = False
+            self.mouse.scroll_up()
+        if current_states[self.VK_Q] and not prev_states[self.VK_Q]:
+            self.waiting_for_release = False
+            self.quit_app()
+
+        # Проверяем клавиши для оверлея
+        if self.overlay.is_visible:
+            # Сбрасываем последовательность, если прошло слишком много времени
+            if current_time - self.last_key_time > self.sequence_timeout and self.current_sequence:
+                logger.debug(f"Timeout, resetting sequence: {self.current_sequence}")
+                self.current_sequence = ""
                 self.waiting_for_release = False
-                self.quit_app()
-
-            # Проверяем клавиши для оверлея
-            if self.overlay.is_visible:
-                # Сбрасываем последовательность, если прошло слишком много времени
-                if current_time - self.last_key_time > self.sequence_timeout and self.current_sequence:
-                    logger.debug(f"Timeout, resetting sequence: {self.current_sequence}")
-                    self.current_sequence = ""
-                    self.waiting_for_release = False
 
-                # Проверяем, отпущена ли предыдущая клавиша
-                if self.waiting_for_release:
-                    if not cast(int, win32api.GetAsyncKeyState(self.last_pressed_key)) & self.mask:
-                        self.waiting_for_release = False
-                        logger.debug("Key released")
-                    continue
-
-                # Проверяем нажатия клавиш
-                for vk_code in range(65, 91):  # A-Z
-                    if cast(int, win32api.GetAsyncKeyState(vk_code)) & self.mask:
-                        if not self._check_overlay_key(vk_code):
-                            continue
-
-                        char = chr(vk_code).lower()
-                        logger.debug(f"Key pressed: {char}")
-
-                        # Если это первая буква
-                        if not self.current_sequence:
-                            self.current_sequence = char
-                            self.last_key_time = current_time
-                            self.last_pressed_key = vk_code
-                            self.waiting_for_release = True
-                            logger.debug(f"First char: {char}")
-
-                        # Если это вторая буква и она отличается от первой
-                        elif vk_code != self.last_pressed_key:
-                            self.current_sequence += char
-                            logger.debug(f"Second char, sequence: {self.current_sequence}")
-
-                            # Проверяем комбинацию
-                            target = self.overlay.get_target(self.current_sequence)
-                            if target:
-                                logger.debug(f"Using combination: {self.current_sequence}")
-                                x, y = target
-                                self.mouse.move_to(x, y)
-                                self._hide_overlay_if_visible()
-                                self.mouse.click()
-                            else:
-                                logger.debug(f"Invalid combination: {self.current_sequence}")
-
-                            # В любом случае сбрасываем последовательность
-                            self.current_sequence = ""
-                            self.waiting_for_release = True
-                            self.last_pressed_key = vk_code
-
-            prev_states = current_states
-            win32api.Sleep(10)  # задержка для снижения нагрузки на CPU
+            # Проверяем, отпущена ли предыдущая клавиша
+            if self.waiting_for_release:
+                if not self._is_key_down(self.last_pressed_key):
+                    self.waiting_for_release = False
+                    logger.debug("Key released")
+                return
+
+            # Проверяем нажатия клавиш
+            for vk_code in range(65, 91):  # A-Z
+                if self._is_key_down(vk_code):
+                    if not self._check_overlay_key(vk_code):
+                        continue
+
+                    char = chr(vk_code).lower()
+                    logger.debug(f"Key pressed: {char}")
+
+                    # Если это первая буква
+                    if not self.current_sequence:
+                        self.current_sequence = char
+                        self.last_key_time = current_time
+                        self.last_pressed_key = vk_code
+                        self.waiting_for_release = True
+                        logger.debug(f"First char: {char}")
+
+                    # Если это вторая буква и она отличается от первой
+                    elif vk_code != self.last_pressed_key:
+                        self.current_sequence += char
+                        logger.debug(f"Second char, sequence: {self.current_sequence}")
+
+                        # Проверяем комбинацию
+                        target = self.overlay.get_target(self.current_sequence)
+                        if target:
+                            logger.debug(f"Using combination: {self.current_sequence}")
+                            x, y = target
+                            self.mouse.move_to(x, y)
+                            self._hide_overlay_if_visible()
+                            self.mouse.click()
+                        else:
+                            logger.debug(f"Invalid combination: {self.current_sequence}")
+
+                        # В любом случае сбрасываем последовательность
+                        self.current_sequence = ""
+                        self.waiting_for_release = True
+                        self.last_pressed_key = vk_code
+
+        self.prev_states = current_states
 
     def start(self) -> None:
         """Запускает обработчики клавиатуры."""
@@ -154,10 +205,13 @@ class KeyboardHandler:
             self.listener_thread.start()
             logger.debug("Keyboard handler started")
 
-    def _toggle_overlay(self) -> None:
-        """Переключает видимость оверлея."""
+    def _toggle_overlay(self, active_window: bool = False) -> None:
+        """Переключает видимость оверлея (для всего экрана или активного окна)."""
         if not self.overlay.is_visible:
-            self.overlay.show()
+            if active_window:
+                self.overlay.show_active_window()
+            else:
+                self.overlay.show()
             logger.debug("overlay shown")
         else:
             self.overlay.hide()
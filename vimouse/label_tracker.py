@@ -0,0 +1,85 @@
+from collections.abc import Sequence
+
+
+class LabelTracker:
+    """
+    Сохраняет буквенные метки между активациями оверлея.
+
+    Новые регионы сопоставляются с целями прошлой активации: точки
+    раскладываются по сетке с шагом max_displacement (пространственный
+    индекс), кандидаты ищутся только в соседних ячейках, затем пары
+    назначаются жадно от ближайших к дальним. Сопоставленный регион
+    получает старую метку, остальные - свободные метки.
+    """
+
+    def __init__(self, max_displacement: int = 24) -> None:
+        self.max_displacement = max_displacement
+        self.previous: dict[str, tuple[int, int]] = {}
+
+    def reset(self) -> None:
+        """Забывает цели прошлой активации."""
+        self.previous = {}
+
+    def _match(self, regions: Sequence[tuple[int, int]]) -> dict[int, str]:
+        """Сопоставляет регионы со старыми метками. Возвращает {индекс региона: метка}."""
+        if not self.previous or not regions:
+            return {}
+
+        cell = max(1, self.max_displacement)
+        max_dist_sq = self.max_displacement * self.max_displacement
+
+        # Пространственный индекс старых целей
+        grid: dict[tuple[int, int], list[tuple[str, int, int]]] = {}
+        for label, (x, y) in self.previous.items():
+            grid.setdefault((x // cell, y // cell), []).append((label, x, y))
+
+        # Все пары в пределах допустимого смещения
+        pairs: list[tuple[int, int, str]] = []
+        for i, (x, y) in enumerate(regions):
+            cx, cy = x // cell, y // cell
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for label, px, py in grid.get((gx, gy), ()):
+                        dist_sq = (px - x) ** 2 + (py - y) ** 2
+                        if dist_sq <= max_dist_sq:
+                            pairs.append((dist_sq, i, label))
+
+        # Жадное назначение: ближайшие пары первыми
+        pairs.sort()
+        matched: dict[int, str] = {}
+        used_labels: set[str] = set()
+        for _, i, label in pairs:
+            if i in matched or label in used_labels:
+                continue
+            matched[i] = label
+            used_labels.add(label)
+        return matched
+
+    def assign(
+        self,
+        regions: Sequence[tuple[int, int]],
+        labels: Sequence[str],
+    ) -> dict[str, tuple[int, int]]:
+        """
+        Назначает метки регионам с учетом прошлой активации.
+        Регионов получает не больше, чем есть меток.
+        """
+        matched = self._match(regions)
+        label_set = set(labels)
+        used = {label for label in matched.values() if label in label_set}
+
+        # Свободные метки в обычном порядке приоритета, кроме занятых сопоставленными целями
+        free = [label for label in labels if label not in used]
+        free.reverse()
+
+        targets: dict[str, tuple[int, int]] = {}
+        for i, region in enumerate(regions):
+            label = matched.get(i)
+            if label is None or label not in label_set:
+                if not free:
+                    continue
+                label = free.pop()
+            targets[label] = region
+
+        self.previous = dict(targets)
+        return targets
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 
 import pyautogui
 
+from .recorder import EVENT_MOUSE, InputRecorder
+
 
 @dataclass
 class MousePosition:
@@ -10,18 +12,26 @@ class MousePosition:
 
 
 class MouseController:
-    def __init__(self) -> None:
+    def __init__(self, recorder: InputRecorder | None = None) -> None:
         # Настройки скроллинга
         self.scroll_step = 100
         self._last_position: MousePosition | None = None
+        self.recorder = recorder
+
+    def _record(self, action: str, **data: object) -> None:
+        """Записывает действие мыши, если включен recorder."""
+        if self.recorder is not None:
+            self.recorder.record(EVENT_MOUSE, action=action, **data)
 
     def move_to(self, x: int, y: int) -> None:
         """Перемещает курсор в указанные координаты."""
+        self._record('move', x=x, y=y)
         pyautogui.moveTo(x, y)
         self._last_position = MousePosition(x, y)
 
     def click(self, button: str = 'left') -> None:
         """Выполняет клик указанной кнопкой мыши."""
+        self._record('click', button=button)
         pyautogui.click(button=button)
 
     def right_click(self) -> None:
@@ -30,18 +40,22 @@ class MouseController:
 
     def start_selection(self) -> None:
         """Начинает выделение (зажимает левую кнопку)."""
+        self._record('mouse_down')
         pyautogui.mouseDown()
 
     def end_selection(self) -> None:
         """Заканчивает выделение (отпускает левую кнопку)."""
+        self._record('mouse_up')
         pyautogui.mouseUp()
 
     def scroll_up(self) -> None:
         """Прокручивает страницу вверх."""
+        self._record('scroll', amount=self.scroll_step)
         pyautogui.scroll(self.scroll_step)
 
     def scroll_down(self) -> None:
         """Прокручивает страницу вниз."""
+        self._record('scroll', amount=-self.scroll_step)
         pyautogui.scroll(-self.scroll_step)
 
     @property
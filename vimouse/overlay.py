@@ -1,3 +1,4 @@
+import time
 from typing import cast
 
 from loguru import logger
@@ -12,11 +13,17 @@ from PyQt6.QtGui import (
 )
 from PyQt6.QtWidgets import QWidget
 
+from .label_tracker import LabelTracker
+from .recorder import EVENT_OVERLAY, InputRecorder
 from .screen_analyzer import ScreenAnalyzer
 
 
 class OverlayWindow(QWidget):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        recorder: InputRecorder | None = None,
+        screen_analyzer: ScreenAnalyzer | None = None,
+    ) -> None:
         super().__init__()
         self.setWindowFlags(
             Qt.WindowType.FramelessWindowHint |
@@ -32,7 +39,11 @@ class OverlayWindow(QWidget):
         self.cell_size = 100
         self._font = QFont('Arial', 14)
         self.targets: dict[str, tuple[int, int]] = {}
-        self.screen_analyzer = ScreenAnalyzer()
+        self.recorder = recorder
+        self.screen_analyzer = screen_analyzer or ScreenAnalyzer(recorder)
+        self.label_tracker = LabelTracker()
+        self._labels: list[str] | None = None
+        self.region: tuple[int, int, int, int] | None = None  # область анализа
 
         # Инициализация UI
         self._init_ui()
@@ -48,15 +59,37 @@ class OverlayWindow(QWidget):
         screen = cast(QScreen, app.primaryScreen())
         self.setGeometry(screen.geometry())
 
-    def show(self) -> None:
-        """Показывает оверлей и генерирует подсказки."""
+    def show(self, region: tuple[int, int, int, int] | None = None) -> None:
+        """Показывает оверлей и генерирует подсказки (по всему экрану или в области region)."""
+        self.region = region
+        shown_at = self.recorder.clock() if self.recorder is not None else 0.0
+        started = time.perf_counter()
         self._generate_targets()
         self._is_visible = True
+        if self.recorder is not None:
+            # duration - сколько опрос клавиатуры был заблокирован анализом
+            self.recorder.record(
+                EVENT_OVERLAY,
+                t=shown_at,
+                visible=True,
+                targets=dict(self.targets),
+                region=list(region) if region is not None else None,
+                duration=time.perf_counter() - started,
+            )
         super().show()
 
+    def show_active_window(self) -> None:
+        """Показывает оверлей только для активного окна (или для всего экрана)."""
+        region = self.screen_analyzer.get_active_window_rect()
+        if region is None:
+            logger.debug("Active window not found, using full screen")
+        self.show(region)
+
     def hide(self) -> None:
         """Скрывает оверлей."""
         self._is_visible = False
+        if self.recorder is not None:
+            self.recorder.record(EVENT_OVERLAY, visible=False)
         super().hide()
 
     def close(self) -> bool:
@@ -76,9 +109,30 @@ class OverlayWindow(QWidget):
         self.targets.clear()
 
         # Получаем кликабельные регионы
-        clickable_regions = self.screen_analyzer.get_clickable_regions()
+        clickable_regions = self.screen_analyzer.get_clickable_regions(self.region)
         logger.debug(f"Found {len(clickable_regions)} clickable regions")
 
+        labels = self._get_labels()
+
+        # Для знакомой раскладки приложения метки берутся из профиля
+        warm_start_targets = self.screen_analyzer.warm_start_targets
+        if warm_start_targets:
+            self.label_tracker.previous = dict(warm_start_targets)
+
+        # Назначаем метки кликабельным регионам, сохраняя метки с прошлой активации
+        self.targets.update(self.label_tracker.assign(clickable_regions, labels))
+        self.screen_analyzer.remember_targets(self.targets)
+
+        logger.debug(f"Used targets: {list(self.targets.keys())}")
+
+    def _get_labels(self) -> list[str]:
+        """
+        Возвращает список двухбуквенных меток в порядке приоритета.
+        Список не зависит от экрана, поэтому строится один раз.
+        """
+        if self._labels is not None:
+            return self._labels
+
         # Определяем ряды клавиатуры (QWERTY)
         keyboard_rows = [
             ['q', 'w', 'e', 'r', 't', 'y', 'u', 'i', 'o', 'p'],
@@ -133,25 +187,18 @@ class OverlayWindow(QWidget):
                 if combo2 not in labels:
                     labels.append(combo2)
 
-        # Если нужно больше комбинаций, добавляем диагональные через одну клавишу
-        if len(clickable_regions) > len(labels):
-            for c1 in main_chars:
-                for c2 in neighbors[c1]:
-                    for c3 in neighbors[c2]:
-                        if c3 != c1:
-                            combo = f"{c1}{c3}"
-                            if combo not in labels:
-                                labels.append(combo)
+        # Добавляем диагональные через одну клавишу (используются, если основных не хватает)
+        for c1 in main_chars:
+            for c2 in neighbors[c1]:
+                for c3 in neighbors[c2]:
+                    if c3 != c1:
+                        combo = f"{c1}{c3}"
+                        if combo not in labels:
+                            labels.append(combo)
 
         logger.debug(f"Generated {len(labels)} two-char combinations")
-
-        # Назначаем метки кликабельным регионам
-        for i, (x, y) in enumerate(clickable_regions):
-            if i >= len(labels):
-                break
-            self.targets[labels[i]] = (x, y)
-
-        logger.debug(f"Used targets: {list(self.targets.keys())}")
+        self._labels = labels
+        return labels
 
     def paintEvent(self, a0: QPaintEvent | None) -> None:  # noqa: N802, ARG002
         """Отрисовывает оверлей."""
@@ -161,6 +208,12 @@ class OverlayWindow(QWidget):
         # Полупрозрачный фон
         painter.fillRect(self.rect(), QColor(0, 0, 0, 128))
 
+        # Рамка области анализа
+        if self.region is not None:
+            left, top, right, bottom = self.region
+            painter.setPen(QColor(255, 255, 200, 230))
+            painter.drawRect(left, top, right - left - 1, bottom - top - 1)
+
         # Отрисовка подсказок
         for label, (x, y) in self.targets.items():
             # Увеличиваем размер фона для двойных букв
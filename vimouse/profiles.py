@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# Движки анализа
+ENGINE_AUTO = "auto"  # процесс-анализатор для больших кадров, иначе в своем процессе
+ENGINE_WORKER = "worker"  # процесс-анализатор, если он запущен
+ENGINE_LOCAL = "local"  # в своем процессе: без копирования кадра и обмена с процессом
+
+# Настроенные параметры для известных приложений
+# (ключ - класс окна или имя процесса, см. WindowInfo.app_keys)
+DEFAULT_PROFILE_PARAMS: dict[str, dict[str, Any]] = {
+    # Плотные IDE: много мелких элементов
+    "code.exe": {"max_regions_count": 400, "min_region_area": 12},
+    "pycharm64.exe": {"max_regions_count": 400, "min_region_area": 12},
+    "devenv.exe": {"max_regions_count": 400, "min_region_area": 12},
+    # Браузеры
+    "chrome.exe": {"max_regions_count": 300},
+    "firefox.exe": {"max_regions_count": 300},
+    "msedge.exe": {"max_regions_count": 300},
+    # Стандартные диалоги: мало крупных элементов
+    "#32770": {"max_regions_count": 80, "min_region_area": 24},
+}
+
+# Предпочтительные движки для известных приложений (остальные - ENGINE_AUTO)
+DEFAULT_PROFILE_ENGINES: dict[str, str] = {
+    # Анализ полного экрана IDE долгий: не блокируем GUI и опрос клавиатуры
+    "code.exe": ENGINE_WORKER,
+    "pycharm64.exe": ENGINE_WORKER,
+    "devenv.exe": ENGINE_WORKER,
+    # Диалог маленький: обмен с процессом дольше самого анализа
+    "#32770": ENGINE_LOCAL,
+}
+
+# Размер миниатюры кадра для сравнения раскладок (ячейка ~30x30 px на 1080p)
+SIGNATURE_SIZE = (64, 36)
+
+
+def frame_signature(img: np.ndarray) -> np.ndarray:
+    """Возвращает миниатюру кадра в оттенках серого (отпечаток раскладки)."""
+    thumb = cv2.resize(img, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGRA2GRAY)
+    return thumb
+
+
+@dataclass
+class Layout:
+    size: tuple[int, int]  # ширина, высота кадра
+    signature: np.ndarray
+    targets: dict[str, tuple[int, int]]  # метки целей в координатах кадра
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "size": list(self.size),
+            "signature": self.signature.tobytes().hex(),
+            "targets": {label: list(point) for label, point in self.targets.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Layout":
+        width, height = data["size"]
+        signature = np.frombuffer(bytes.fromhex(data["signature"]), dtype=np.uint8)
+        return cls(
+            size=(int(width), int(height)),
+            signature=signature.reshape(SIGNATURE_SIZE[1], SIGNATURE_SIZE[0]),
+            targets={
+                label: (int(x), int(y)) for label, (x, y) in data.get("targets", {}).items()
+            },
+        )
+
+
+@dataclass
+class DetectionProfile:
+    app_key: str
+    params: dict[str, Any] = field(default_factory=dict)
+    engine: str = ENGINE_AUTO
+    layouts: list[Layout] = field(default_factory=list)  # последние раскладки, новые первыми
+
+    def find_layout(
+        self,
+        size: tuple[int, int],
+        signature: np.ndarray,
+        tolerance: float,
+    ) -> Layout | None:
+        """
+        Ищет сохраненную раскладку, совпадающую с текущим кадром: разница
+        яркости не больше tolerance в каждой ячейке миниатюры, так что
+        любое новое окно или диалог дают промах.
+        """
+        for i, layout in enumerate(self.layouts):
+            if layout.size != size or layout.signature.shape != signature.shape:
+                continue
+            diff = np.abs(layout.signature.astype(np.int16) - signature.astype(np.int16))
+            if int(diff.max()) <= tolerance:
+                # Поднимаем найденную раскладку в начало (LRU)
+                self.layouts.insert(0, self.layouts.pop(i))
+                return layout
+        return None
+
+    def add_layout(self, layout: Layout, max_layouts: int, replace: Layout | None = None) -> None:
+        """Добавляет раскладку (или заменяет replace), вытесняя самые старые."""
+        if replace is not None and replace in self.layouts:
+            self.layouts.remove(replace)
+        self.layouts.insert(0, layout)
+        del self.layouts[max_layouts:]
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "params": self.params,
+            "engine": self.engine,
+            "layouts": [layout.to_json() for layout in self.layouts],
+        }
+
+    @classmethod
+    def from_json(cls, app_key: str, data: dict[str, Any]) -> "DetectionProfile":
+        return cls(
+            app_key=app_key,
+            params=dict(data.get("params", {})),
+            engine=str(data.get("engine", ENGINE_AUTO)),
+            layouts=[Layout.from_json(layout) for layout in data.get("layouts", [])],
+        )
+
+
+class ProfileStore:
+    """
+    Профили обнаружения по приложениям с LRU-кэшем раскладок на диске.
+
+    Хранится не больше max_apps приложений и max_layouts раскладок
+    на приложение; при переполнении вытесняются давно не использованные.
+    Раскладки не заменяют анализ: они только подсказывают метки целей
+    (см. ScreenAnalyzer.warm_start_targets).
+
+    Запись на диск отложенная (save_later): файл пишется в фоне через
+    save_delay секунд после последнего изменения, а не во время активации.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_apps: int = 32,
+        max_layouts: int = 4,
+        tolerance: float = 8.0,
+        save_delay: float = 2.0,
+    ) -> None:
+        self.path = path
+        self.max_apps = max_apps
+        self.max_layouts = max_layouts
+        self.tolerance = tolerance  # наибольшая разница яркости в ячейке миниатюры
+        self.save_delay = save_delay
+        self.profiles: OrderedDict[str, DetectionProfile] = OrderedDict()
+        self.lock = threading.RLock()  # изменения профилей и запись на диск
+        self._save_timer: threading.Timer | None = None
+        if path is not None:
+            self.load()
+
+    def select(self, app_keys: tuple[str, ...]) -> DetectionProfile | None:
+        """
+        Выбирает профиль по ключам окна в порядке приоритета (класс окна,
+        затем процесс): первый ключ с известным профилем, иначе последний.
+        """
+        if not app_keys:
+            return None
+        for key in app_keys:
+            if key in self.profiles or key in DEFAULT_PROFILE_PARAMS:
+                return self.get(key)
+        return self.get(app_keys[-1])
+
+    def get(self, app_key: str) -> DetectionProfile:
+        """Возвращает профиль приложения (создает при первом обращении)."""
+        with self.lock:
+            return self._get_locked(app_key)
+
+    def _get_locked(self, app_key: str) -> DetectionProfile:
+        profile = self.profiles.get(app_key)
+        if profile is None:
+            profile = DetectionProfile(
+                app_key=app_key,
+                params=dict(DEFAULT_PROFILE_PARAMS.get(app_key, {})),
+                engine=DEFAULT_PROFILE_ENGINES.get(app_key, ENGINE_AUTO),
+            )
+            self.profiles[app_key] = profile
+        self.profiles.move_to_end(app_key)
+        while len(self.profiles) > self.max_apps:
+            self.profiles.popitem(last=False)
+        return profile
+
+    def load(self) -> None:
+        """Загружает профили с диска."""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            for app_key, profile_data in data.items():
+                self.profiles[app_key] = DetectionProfile.from_json(app_key, profile_data)
+        except Exception as e:
+            logger.error(f"Error loading profiles: {e}")
+            self.profiles.clear()
+
+    def save_later(self) -> None:
+        """Планирует запись на диск; повторные вызовы откладывают ее."""
+        if self.path is None:
+            return
+        with self.lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.save_delay, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self) -> None:
+        """Сразу записывает отложенные изменения (например, при выходе)."""
+        with self.lock:
+            pending = self._save_timer is not None
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        if pending:
+            self.save()
+
+    def save(self) -> None:
+        """Сохраняет профили на диск (атомарно, через временный файл)."""
+        if self.path is None:
+            return
+        try:
+            with self.lock:
+                self._save_timer = None
+                data = {key: profile.to_json() for key, profile in self.profiles.items()}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving profiles: {e}")
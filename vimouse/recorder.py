@@ -0,0 +1,118 @@
+import json
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# Типы событий в записи
+EVENT_KEY = "key"  # Фронт клавиши: vk, down, source ("poll" или "hook")
+EVENT_OVERLAY = "overlay"  # Переход оверлея: visible, targets, duration (время показа)
+EVENT_ANALYSIS = "analysis"  # Анализ экрана: duration, regions, frame
+EVENT_MOUSE = "mouse"  # Действие мыши: action, x, y
+
+# (время, тип события, данные)
+Event = tuple[float, str, dict[str, Any]]
+
+
+class InputRecorder:
+    """
+    Кольцевой буфер событий ввода ("бортовой самописец").
+
+    Запись - это добавление кортежа в deque, поэтому её можно держать
+    включенной постоянно. Кадры экрана хранятся отдельно и только
+    по запросу (record_frames), так как занимают много памяти.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        max_frames: int = 8,
+        record_frames: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.events: deque[Event] = deque(maxlen=capacity)
+        self.frames: deque[tuple[int, np.ndarray]] = deque(maxlen=max_frames)
+        self.record_frames = record_frames
+        self.clock = clock
+        self._frame_counter = 0
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.events)
+
+    def record(self, kind: str, t: float | None = None, **data: Any) -> None:  # noqa: ANN401
+        """Добавляет событие в буфер."""
+        self.events.append((self.clock() if t is None else t, kind, data))
+
+    def add_frame(self, frame: np.ndarray) -> int | None:
+        """Сохраняет кадр, если включена запись кадров. Возвращает его номер."""
+        if not self.record_frames:
+            return None
+        frame_id = self._frame_counter
+        self._frame_counter += 1
+        self.frames.append((frame_id, frame))
+        return frame_id
+
+    def get_frame(self, frame_id: int) -> np.ndarray | None:
+        """Возвращает сохраненный кадр по номеру."""
+        for stored_id, frame in self.frames:
+            if stored_id == frame_id:
+                return frame
+        return None
+
+    def clear(self) -> None:
+        """Очищает буфер событий и кадров."""
+        self.events.clear()
+        self.frames.clear()
+
+    def dump(self, path: str | Path) -> Path:
+        """
+        Сохраняет запись в JSONL-файл (одно событие на строку).
+        Кадры, если есть, сохраняются рядом в сжатый .npz с тем же именем.
+        """
+        path = Path(path)
+        with path.open("w", encoding="utf-8") as f:
+            for t, kind, data in list(self.events):
+                f.write(json.dumps({"t": t, "k": kind, **data}, separators=(",", ":")))
+                f.write("\n")
+
+        if self.frames:
+            frames = list(self.frames)
+            np.savez_compressed(
+                path.with_suffix(".npz"),
+                **{f"frame_{frame_id}": frame for frame_id, frame in frames},
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "InputRecorder":
+        """Загружает запись, сохраненную через dump()."""
+        path = Path(path)
+        events: list[Event] = []
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                t = float(data.pop("t"))
+                kind = str(data.pop("k"))
+                events.append((t, kind, data))
+
+        recorder = cls(capacity=max(len(events), 1))
+        recorder.events.extend(events)
+
+        frames_path = path.with_suffix(".npz")
+        if frames_path.exists():
+            with np.load(frames_path) as archive:
+                frames = sorted(
+                    (int(name.split("_", 1)[1]), archive[name]) for name in archive.files
+                )
+            recorder.record_frames = True
+            recorder.frames = deque(frames, maxlen=max(len(frames), 1))
+            recorder._frame_counter = frames[-1][0] + 1 if frames else 0
+        return recorder
@@ -0,0 +1,242 @@
+"""
+Воспроизведение записи InputRecorder (см. ReplayDriver).
+
+    uv run python -m vimouse.replay vimouse_record_20250101_120000.jsonl
+    uv run python -m vimouse.replay vimouse_record_20250101_120000.jsonl --analysis
+"""
+
+import argparse
+import time
+from bisect import bisect_right
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .keyboard_handler import KeyboardHandler
+from .recorder import EVENT_ANALYSIS, EVENT_KEY, EVENT_MOUSE, EVENT_OVERLAY, InputRecorder
+
+if TYPE_CHECKING:
+    from .screen_analyzer import ScreenAnalyzer
+
+
+class _ReplayOverlay:
+    """Оверлей для воспроизведения: цели берутся из записанных активаций."""
+
+    def __init__(self, driver: "ReplayDriver") -> None:
+        self._driver = driver
+        self._activations = [
+            (data.get("targets", {}), float(data.get("duration", 0.0)))
+            for _, kind, data in driver.recording
+            if kind == EVENT_OVERLAY and data.get("visible")
+        ]
+        self._next_activation = 0
+        self.targets: dict[str, tuple[int, int]] = {}
+        self.is_visible = False
+
+    def show(self) -> None:
+        targets: dict[str, Any] = {}
+        duration = 0.0
+        if self._next_activation < len(self._activations):
+            targets, duration = self._activations[self._next_activation]
+        self._next_activation += 1
+        # Пока идет анализ экрана, настоящий обработчик не опрашивает клавиатуру
+        self._driver.block(duration)
+        self.targets = {label: (int(x), int(y)) for label, (x, y) in targets.items()}
+        self.is_visible = True
+        self._driver.output.record(EVENT_OVERLAY, visible=True, targets=dict(self.targets))
+
+    def show_active_window(self) -> None:
+        # Область уже учтена в записанных целях
+        self.show()
+
+    def hide(self) -> None:
+        self.is_visible = False
+        self._driver.output.record(EVENT_OVERLAY, visible=False)
+
+    def get_target(self, char: str) -> tuple[int, int] | None:
+        return self.targets.get(char.lower())
+
+
+class _ReplayMouse:
+    """Мышь для воспроизведения: только записывает действия."""
+
+    def __init__(self, driver: "ReplayDriver") -> None:
+        self._driver = driver
+        self.scroll_step = 100
+
+    def move_to(self, x: int, y: int) -> None:
+        self._driver.output.record(EVENT_MOUSE, action="move", x=x, y=y)
+
+    def click(self, button: str = "left") -> None:
+        self._driver.output.record(EVENT_MOUSE, action="click", button=button)
+
+    def scroll_up(self) -> None:
+        self._driver.output.record(EVENT_MOUSE, action="scroll", amount=self.scroll_step)
+
+    def scroll_down(self) -> None:
+        self._driver.output.record(EVENT_MOUSE, action="scroll", amount=-self.scroll_step)
+
+
+class _ReplayKeyboardHandler(KeyboardHandler):
+    def quit_app(self) -> None:
+        """Вместо выхода из процесса просто останавливает воспроизведение."""
+        self._hide_overlay_if_visible()
+        self.running = False
+
+
+class ReplayDriver:
+    """
+    Детерминированно воспроизводит запись InputRecorder.
+
+    Клавиатура: состояние клавиш восстанавливается по записанным фронтам,
+    обработчик опрашивается по виртуальным часам с тем же шагом, что и
+    в реальном потоке (10 мс). Результат - новая запись с переходами
+    оверлея и действиями мыши, которую можно сравнить с исходной.
+
+    Если в записи есть фронты из хука клавиатуры (source="hook"), берутся
+    только они: опрос идет по чистой сетке и пропускает время показа
+    оверлея, поэтому короткие нажатия и нажатия во время анализа теряются
+    так же, как в исходной сессии. Для записей без хука опрос выполняется
+    еще и в моменты записанных фронтов.
+
+    Анализ: записанные кадры прогоняются через ScreenAnalyzer.analyze_frame.
+    """
+
+    def __init__(self, recording: InputRecorder, poll_interval: float = 0.01) -> None:
+        self.recording = recording
+        self.poll_interval = poll_interval
+        self.output = InputRecorder(capacity=max(len(recording), 1) * 2, clock=self._clock)
+        self._now = 0.0
+        self._blocked = 0.0  # сколько опрос заблокирован текущим шагом
+
+        # Фронты из хука полнее фронтов из опроса, поэтому при их наличии берутся только они
+        self.from_hook = any(
+            kind == EVENT_KEY and data.get("source") == "hook" for _, kind, data in recording
+        )
+
+        # Фронты по каждой клавише: отсортированные времена и состояния
+        self._edge_times: dict[int, list[float]] = {}
+        self._edge_states: dict[int, list[bool]] = {}
+        for t, kind, data in sorted(recording, key=lambda event: event[0]):
+            if kind != EVENT_KEY or self.from_hook != (data.get("source") == "hook"):
+                continue
+            vk = int(data["vk"])
+            self._edge_times.setdefault(vk, []).append(t)
+            self._edge_states.setdefault(vk, []).append(bool(data["down"]))
+
+    def _clock(self) -> float:
+        return self._now
+
+    def key_state(self, vk_code: int) -> int:
+        """Состояние клавиши в текущий виртуальный момент (как GetAsyncKeyState)."""
+        times = self._edge_times.get(vk_code)
+        if not times:
+            return 0
+        idx = bisect_right(times, self._now) - 1
+        if idx < 0 or not self._edge_states[vk_code][idx]:
+            return 0
+        return 0x8000
+
+    def block(self, duration: float) -> None:
+        """Задерживает следующий опрос на duration (учитывается только для записей с хуком)."""
+        if self.from_hook:
+            self._blocked += duration
+
+    def _schedule(self, tail: float) -> Iterator[float]:
+        """
+        Моменты опроса: регулярная сетка (после блокировки - со сдвигом)
+        плюс, для записей без хука, моменты фронтов.
+        """
+        edges = sorted({t for times in self._edge_times.values() for t in times})
+        if not edges:
+            return
+        start, end = edges[0], edges[-1] + tail
+
+        if not self.from_hook:
+            ticks = np.arange(start, end + self.poll_interval, self.poll_interval)
+            yield from sorted(set(edges) | {float(t) for t in ticks})
+            return
+
+        t = start
+        while t <= end:
+            yield t
+            t += self._blocked + self.poll_interval
+            self._blocked = 0.0
+
+    def replay_keyboard(self) -> InputRecorder:
+        """Прогоняет записанные нажатия через KeyboardHandler."""
+        self.output.clear()
+        self._blocked = 0.0
+        handler = _ReplayKeyboardHandler(
+            _ReplayOverlay(self),  # type: ignore[arg-type]
+            _ReplayMouse(self),  # type: ignore[arg-type]
+            key_state=self.key_state,
+            clock=self._clock,
+            autostart=False,
+        )
+        handler.running = True
+
+        for t in self._schedule(tail=handler.sequence_timeout + self.poll_interval):
+            self._now = t
+            handler.poll(t)
+            if not handler.running:
+                break
+        return self.output
+
+    def replay_analysis(
+        self,
+        analyzer: "ScreenAnalyzer | None" = None,
+    ) -> list[tuple[int, list[tuple[int, int]], float]]:
+        """
+        Прогоняет записанные кадры через анализатор.
+        Возвращает (номер кадра, регионы, длительность в секундах) для каждого кадра.
+        """
+        if analyzer is None:
+            # Анализатор (и Win32) нужен только для воспроизведения кадров
+            from .screen_analyzer import ScreenAnalyzer
+
+            analyzer = ScreenAnalyzer()
+        results: list[tuple[int, list[tuple[int, int]], float]] = []
+        for frame_id, frame in self.recording.frames:
+            started = time.perf_counter()
+            regions = analyzer.analyze_frame(frame)
+            results.append((frame_id, regions, time.perf_counter() - started))
+        return results
+
+    def recorded_analysis_durations(self) -> list[float]:
+        """Длительности анализа, записанные в исходной сессии."""
+        return [
+            float(data["duration"])
+            for _, kind, data in self.recording
+            if kind == EVENT_ANALYSIS
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воспроизведение записи ввода ViMouse")
+    parser.add_argument("path", help="файл записи (vimouse_record_*.jsonl)")
+    parser.add_argument(
+        "--analysis",
+        action="store_true",
+        help="также прогнать записанные кадры через анализатор и сравнить время",
+    )
+    args = parser.parse_args()
+
+    driver = ReplayDriver(InputRecorder.load(args.path))
+    source = "hook" if driver.from_hook else "poll"
+    print(f"Keyboard replay ({source} edges):")
+    for t, kind, data in driver.replay_keyboard():
+        print(f"  {t:.3f} {kind} {data}")
+
+    if args.analysis:
+        recorded = driver.recorded_analysis_durations()
+        print("Analysis replay:")
+        for frame_id, regions, duration in driver.replay_analysis():
+            print(f"  frame {frame_id}: {len(regions)} regions, {duration * 1000:.1f} ms")
+        if recorded:
+            print(f"  recorded: {', '.join(f'{d * 1000:.1f} ms' for d in recorded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import time
+
 import cv2
 import numpy as np
 import win32con
@@ -5,10 +7,62 @@ import win32gui
 import win32ui
 from loguru import logger
 
+from .analysis_worker import AnalysisWorker
+from .detection import (
+    PERSISTENT_BYTES_PER_PIXEL,
+    STRIP_BYTES_PER_PIXEL,
+    find_components,
+    find_components_by_strips,
+    strip_rows_for_budget,
+)
+from .profiles import (
+    ENGINE_AUTO,
+    ENGINE_LOCAL,
+    ENGINE_WORKER,
+    DetectionProfile,
+    Layout,
+    ProfileStore,
+    frame_signature,
+)
+from .recorder import EVENT_ANALYSIS, InputRecorder
+from .window_info import WindowInfoProvider
+
+# Режимы обработки полосами
+STRIP_MODE_AUTO = "auto"  # полосами, если весь кадр не укладывается в бюджет памяти
+STRIP_MODE_ALWAYS = "always"
+STRIP_MODE_NEVER = "never"
+
+# Параметры, которые передаются в процесс-анализатор вместе с кадром
+TUNING_PARAMS = (
+    "min_regions_count",
+    "max_regions_count",
+    "min_region_area",
+    "max_region_area",
+    "min_aspect_ratio",
+    "max_aspect_ratio",
+    "strip_mode",
+    "strip_memory_budget",
+    "strip_halo",
+)
+
+# ENGINE_AUTO: кадры меньше этого (окно, диалог) анализируются в своем процессе,
+# так как копирование в разделяемую память и обмен с процессом дольше анализа
+LOCAL_ANALYSIS_MAX_PIXELS = 1280 * 720
+
 
 class ScreenAnalyzer:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        recorder: InputRecorder | None = None,
+        worker: AnalysisWorker | None = None,
+        profiles: ProfileStore | None = None,
+        window_provider: WindowInfoProvider | None = None,
+    ) -> None:
         """Инициализирует анализатор экрана."""
+        self.recorder = recorder
+        self.worker = worker
+        self.profiles = profiles
+        self.window_provider = window_provider
         self.min_regions_count = 20
         self.max_regions_count = 250
         self.min_region_area = 16
@@ -24,15 +78,185 @@ class ScreenAnalyzer:
         self.max_brightness = 500
         self.min_distance = 9
 
-    def get_clickable_regions(self) -> list[tuple[int, int]]:
+        # Обработка полосами для больших кадров (4K/8K, несколько мониторов)
+        self.strip_mode = STRIP_MODE_AUTO
+        self.strip_memory_budget = 256 * 1024 * 1024  # байт на один анализ
+        self.strip_halo = 16  # строк перекрытия между полосами
+
+        # Значения, которые заменил профиль активного приложения (см. _select_profile)
+        self._overridden_params: dict[str, int | float | str] = {}
+
+        # Метки, сохраненные для совпавшей раскладки (экранные координаты):
+        # подсказка для LabelTracker, сам анализ выполняется всегда
+        self.warm_start_targets: dict[str, tuple[int, int]] | None = None
+        # Раскладка последнего анализа: профиль, размер, миниатюра,
+        # совпавшая раскладка и смещение кадра (см. remember_targets)
+        self._pending_layout: (
+            tuple[DetectionProfile, tuple[int, int], np.ndarray, Layout | None, tuple[int, int]]
+            | None
+        ) = None
+
+    def get_clickable_regions(
+        self,
+        region: tuple[int, int, int, int] | None = None,
+    ) -> list[tuple[int, int]]:
         """
-        Анализирует скриншот и возвращает список координат кликабельных
-        элементов.
+        Делает снимок экрана и возвращает список координат кликабельных
+        элементов (см. analyze_frame).
+
+        region (left, top, right, bottom) ограничивает анализ прямоугольником,
+        например окном активного приложения: снимается и анализируется только
+        он, координаты возвращаются в экранных координатах, точки вне
+        прямоугольника отбрасываются.
+
+        Если заданы профили, параметры берутся из профиля активного
+        приложения. Анализ выполняется всегда; при совпадении кадра с недавней
+        раскладкой приложения ее метки попадают в warm_start_targets, чтобы
+        цели на прежних местах получили прежние метки.
+        """
+        self.warm_start_targets = None
+        self._pending_layout = None
+        try:
+            img, (left, top, right, bottom) = self._capture_screen(region)
+            started = time.perf_counter()
+            profile = self._select_profile()
+            clickable_regions = self._run_analysis(
+                img,
+                profile.engine if profile is not None else ENGINE_AUTO,
+            )
+            warm_start = False
+
+            if profile is not None and self.profiles is not None:
+                size = (img.shape[1], img.shape[0])
+                signature = frame_signature(img)
+                with self.profiles.lock:
+                    layout = profile.find_layout(size, signature, self.profiles.tolerance)
+                    if layout is not None:
+                        self.warm_start_targets = {
+                            label: (x + left, y + top) for label, (x, y) in layout.targets.items()
+                        }
+                        warm_start = True
+                self._pending_layout = (profile, size, signature, layout, (left, top))
+            duration = time.perf_counter() - started
+
+            if self.recorder is not None:
+                frame_id = self.recorder.add_frame(img)
+                self.recorder.record(
+                    EVENT_ANALYSIS,
+                    duration=duration,
+                    regions=len(clickable_regions),
+                    frame=frame_id,
+                    warm_start=warm_start,
+                    roi=[left, top, right, bottom] if region is not None else None,
+                )
+        except Exception as e:
+            logger.error(f"Error analyzing screen: {e}")
+            # В случае ошибки возвращаем сетку точек
+            if region is not None:
+                left, top, right, bottom = region
+                return self._to_screen(
+                    self._generate_grid_points(right - left, bottom - top),
+                    region,
+                )
+            return self._generate_grid_points(1920, 1080)  # Стандартное Full HD разрешение
+        else:
+            if region is not None:
+                return self._to_screen(clickable_regions, (left, top, right, bottom))
+            return clickable_regions
 
-        Использует различные методы компьютерного зрения для поиска:
-        - Контрастных областей
-        - Границ элементов
-        - Текстовых блоков
+    def remember_targets(self, targets: dict[str, tuple[int, int]]) -> None:
+        """
+        Запоминает метки последнего анализа как раскладку профиля.
+        Запись на диск выполняется позже, вне активации оверлея.
+        """
+        if self._pending_layout is None or self.profiles is None:
+            return
+        profile, size, signature, matched, (left, top) = self._pending_layout
+        self._pending_layout = None
+        local_targets = {label: (x - left, y - top) for label, (x, y) in targets.items()}
+        with self.profiles.lock:
+            profile.add_layout(
+                Layout(size, signature, local_targets),
+                self.profiles.max_layouts,
+                replace=matched,
+            )
+        self.profiles.save_later()
+
+    def _to_screen(
+        self,
+        regions: list[tuple[int, int]],
+        rect: tuple[int, int, int, int],
+    ) -> list[tuple[int, int]]:
+        """Переводит координаты кадра области в экранные и отбрасывает точки вне области."""
+        left, top, right, bottom = rect
+        screen_regions = [(x + left, y + top) for x, y in regions]
+        return [(x, y) for x, y in screen_regions if left <= x < right and top <= y < bottom]
+
+    def get_active_window_rect(self) -> tuple[int, int, int, int] | None:
+        """Возвращает прямоугольник активного окна или None."""
+        if self.window_provider is None:
+            return None
+        info = self.window_provider.get_foreground()
+        if info is None:
+            return None
+        left, top, right, bottom = info.rect
+        if right <= left or bottom <= top:
+            return None
+        return info.rect
+
+    def _select_profile(self) -> DetectionProfile | None:
+        """
+        Выбирает профиль активного приложения и применяет его параметры.
+        Сначала возвращаются значения, замененные предыдущим профилем, чтобы
+        его настройки не переходили к следующему приложению; остальные
+        параметры (в том числе измененные вручную) не трогаются.
+        """
+        self._apply_params(self._overridden_params)
+        self._overridden_params = {}
+        if self.profiles is None or self.window_provider is None:
+            return None
+        info = self.window_provider.get_foreground()
+        if info is None:
+            return None
+
+        profile = self.profiles.select(info.app_keys)
+        if profile is None:
+            return None
+        self._overridden_params = {
+            name: getattr(self, name) for name in profile.params if name in TUNING_PARAMS
+        }
+        self._apply_params(profile.params)
+        logger.debug(f"Using detection profile: {profile.app_key}")
+        return profile
+
+    def _run_analysis(self, img: np.ndarray, engine: str) -> list[tuple[int, int]]:
+        """Анализирует кадр выбранным движком (с откатом на локальный анализ)."""
+        if engine == ENGINE_AUTO:
+            height, width = img.shape[:2]
+            engine = ENGINE_LOCAL if width * height < LOCAL_ANALYSIS_MAX_PIXELS else ENGINE_WORKER
+        if self.worker is not None and engine == ENGINE_WORKER:
+            regions = self.worker.analyze(img, self.get_params())
+            if regions is not None:
+                return regions
+        return self.analyze_frame(img)
+
+    def _apply_params(self, params: dict[str, int | float | str]) -> None:
+        """Применяет параметры фильтрации (только из TUNING_PARAMS)."""
+        for name, value in params.items():
+            if name in TUNING_PARAMS:
+                setattr(self, name, value)
+
+    def get_params(self) -> dict[str, int | float | str]:
+        """Возвращает текущие параметры фильтрации (см. TUNING_PARAMS)."""
+        return {name: getattr(self, name) for name in TUNING_PARAMS}
+
+    def _capture_screen(
+        self,
+        region: tuple[int, int, int, int] | None = None,
+    ) -> tuple[np.ndarray, tuple[int, int, int, int]]:
+        """
+        Захватывает экран (или область region) и возвращает кадр в формате BGRA
+        вместе с фактически снятым прямоугольником (область обрезается по экрану).
         """
         # Объявляем переменные для ресурсов, чтобы освободить их в finally
         hwnd_dc = None
@@ -45,6 +269,17 @@ class ScreenAnalyzer:
             # Получаем размеры экрана через GetWindowRect
             hwnd: int = win32gui.GetDesktopWindow()  # type: ignore[arg-type]
             left, top, right, bottom = win32gui.GetWindowRect(hwnd)  # type: ignore[arg-type]
+            src_x, src_y = 0, 0
+            if region is not None:
+                # Обрезаем область по границам экрана
+                src_left = max(left, region[0])
+                src_top = max(top, region[1])
+                right = min(right, region[2])
+                bottom = min(bottom, region[3])
+                src_x, src_y = src_left - left, src_top - top
+                left, top = src_left, src_top
+                if right <= left or bottom <= top:
+                    raise ValueError(f"Region {region} is outside the screen")
             width = right - left
             height = bottom - top
 
@@ -63,7 +298,7 @@ class ScreenAnalyzer:
                 (0, 0),
                 (width, height),
                 mfc_dc,
-                (0, 0),
+                (src_x, src_y),
                 win32con.SRCCOPY,
             )
 
@@ -72,128 +307,7 @@ class ScreenAnalyzer:
             bmpstr = save_bit_map.GetBitmapBits(size)  # type: ignore[arg-type]
             img = np.frombuffer(bmpstr, dtype=np.uint8)  # type: ignore[arg-type]
             img.shape = (height, width, 4)
-
-            # Конвертируем в оттенки серого
-            gray = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
-
-            # 1. Метод градиентов с меньшими порогами
-            sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-            sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-            gradient_magnitude = np.sqrt(sobelx**2 + sobely**2)
-            gradient_magnitude = cv2.normalize(
-                gradient_magnitude,
-                None,
-                0,
-                255,
-                cv2.NORM_MINMAX,
-            )
-            gradient_magnitude = np.uint8(gradient_magnitude)
-
-            # 2. Метод адаптивной бинаризации с меньшим размером окна
-            binary_adaptive = cv2.adaptiveThreshold(
-                gray,
-                255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY_INV,
-                9,
-                3,
-            )
-
-            # 3. Метод Кэнни с меньшими порогами
-            edges = cv2.Canny(gray, 15, 80)
-
-            # Комбинируем результаты
-            combined = cv2.bitwise_or(gradient_magnitude, edges)
-            combined = cv2.bitwise_or(combined, binary_adaptive)
-
-            # Морфологические операции для улучшения результата
-            kernel = np.ones((2, 2), np.uint8)
-            combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
-            combined = cv2.morphologyEx(combined, cv2.MORPH_OPEN, kernel)
-
-            # Находим компоненты связности
-            num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(combined)
-
-            # Фильтруем компоненты по размеру и форме
-            clickable_regions: list[tuple[int, int]] = []
-
-            for i in range(1, num_labels):  # Пропускаем фон (метка 0)
-                area = stats[i, cv2.CC_STAT_AREA]
-                width = stats[i, cv2.CC_STAT_WIDTH]
-                height = stats[i, cv2.CC_STAT_HEIGHT]
-
-                if self.min_region_area < area < self.max_region_area:
-                    aspect_ratio = float(width) / height if height > 0 else 0
-                    if self.min_aspect_ratio < aspect_ratio < self.max_aspect_ratio:
-                        x = stats[i, cv2.CC_STAT_LEFT]
-                        y = stats[i, cv2.CC_STAT_TOP]
-                        roi = gray[y : y + height, x : x + width]
-
-                        if roi.size > 0:
-                            # Проверяем несколько характеристик области
-                            std = float(np.std(np.asarray(roi, dtype=np.float64)))  # Контрастность
-                            mean = float(np.mean(roi))  # Средняя яркость
-                            edges_roi = edges[y : y + height, x : x + width]
-                            edge_density = float(np.sum(edges_roi)) / area  # Плотность краев
-
-                            # Ослабляем критерии проверки
-                            if (
-                                std > 10  # Ещё меньше порог контрастности
-                                and (mean < 245 or mean > 15)  # Расширяем диапазон яркости
-                                and edge_density > 0.02  # Меньше плотность краев
-                            ):
-                                center_x = int(centroids[i][0])
-                                center_y = int(centroids[i][1])
-                                clickable_regions.append((center_x, center_y))
-
-            # Удаляем слишком близкие точки
-            filtered_regions: list[tuple[int, int]] = []
-            min_distance = 18  # Уменьшаем минимальное расстояние между точками
-
-            for x1, y1 in clickable_regions:
-                too_close = False
-                for x2, y2 in filtered_regions:
-                    distance = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-                    if distance < min_distance:
-                        too_close = True
-                        break
-                if not too_close:
-                    filtered_regions.append((x1, y1))
-
-            clickable_regions = filtered_regions
-
-            # Если нашли слишком много регионов, фильтруем по контрастности
-            if len(clickable_regions) > self.max_regions_count:
-
-                def get_region_contrast(region: tuple[int, int]) -> float:
-                    x, y = region
-                    region_size = 15  # Увеличиваем размер области
-                    x1, y1 = max(0, x - region_size), max(0, y - region_size)
-                    x2, y2 = (
-                        min(gray.shape[1], x + region_size),
-                        min(gray.shape[0], y + region_size),
-                    )
-                    region_pixels = gray[y1:y2, x1:x2]
-                    if region_pixels.size == 0:
-                        return 0.0
-                    return float(np.std(np.asarray(region_pixels, dtype=np.float64)))
-
-                clickable_regions.sort(key=get_region_contrast, reverse=True)
-                clickable_regions = clickable_regions[: self.max_regions_count]
-
-            # Если нашли слишком мало регионов, добавляем сетку
-            if len(clickable_regions) < self.min_regions_count:
-                grid_points = self._generate_grid_points(width, height)
-                clickable_regions.extend(grid_points)
-
-            logger.debug(f"Found {len(clickable_regions)} clickable regions")
-
-        except Exception as e:
-            logger.error(f"Error analyzing screen: {e}")
-            # В случае ошибки возвращаем сетку точек
-            return self._generate_grid_points(1920, 1080)  # Стандартное Full HD разрешение
-        else:
-            return clickable_regions
+            return img, (left, top, right, bottom)
         finally:
             # Освобождаем ресурсы Windows в правильном порядке
             try:
@@ -208,6 +322,131 @@ class ScreenAnalyzer:
             except Exception as e:
                 logger.error(f"Error releasing resources: {e}")
 
+    def analyze_frame(self, img: np.ndarray) -> list[tuple[int, int]]:
+        """
+        Анализирует кадр (BGRA) и возвращает список координат кликабельных
+        элементов.
+
+        Использует различные методы компьютерного зрения для поиска:
+        - Контрастных областей
+        - Границ элементов
+        - Текстовых блоков
+        """
+        frame_height, frame_width = img.shape[:2]
+
+        if self._use_strips(frame_width, frame_height):
+            strip_rows = strip_rows_for_budget(
+                frame_width,
+                frame_height,
+                self.strip_memory_budget,
+                self.strip_halo,
+            )
+            logger.debug(f"Strip analysis: {strip_rows} rows per strip")
+            gray, edges, stats, centroids = find_components_by_strips(
+                img,
+                strip_rows,
+                self.strip_halo,
+            )
+        else:
+            gray, edges, stats, centroids = find_components(img)
+
+        return self._select_regions(gray, edges, stats, centroids)
+
+    def _use_strips(self, width: int, height: int) -> bool:
+        """Нужно ли обрабатывать кадр полосами, чтобы уложиться в бюджет памяти."""
+        if self.strip_mode == STRIP_MODE_NEVER:
+            return False
+        if self.strip_mode == STRIP_MODE_ALWAYS:
+            return True
+        frame_bytes = width * height * (STRIP_BYTES_PER_PIXEL + PERSISTENT_BYTES_PER_PIXEL)
+        return frame_bytes > self.strip_memory_budget
+
+    def _select_regions(
+        self,
+        gray: np.ndarray,
+        edges: np.ndarray,
+        stats: np.ndarray,
+        centroids: np.ndarray,
+    ) -> list[tuple[int, int]]:
+        """Отбирает кликабельные элементы среди компонент связности."""
+        frame_height, frame_width = gray.shape[:2]
+        num_labels = len(stats)
+
+        # Фильтруем компоненты по размеру и форме
+        clickable_regions: list[tuple[int, int]] = []
+
+        for i in range(1, num_labels):  # Пропускаем фон (метка 0)
+            area = stats[i, cv2.CC_STAT_AREA]
+            width = stats[i, cv2.CC_STAT_WIDTH]
+            height = stats[i, cv2.CC_STAT_HEIGHT]
+
+            if self.min_region_area < area < self.max_region_area:
+                aspect_ratio = float(width) / height if height > 0 else 0
+                if self.min_aspect_ratio < aspect_ratio < self.max_aspect_ratio:
+                    x = stats[i, cv2.CC_STAT_LEFT]
+                    y = stats[i, cv2.CC_STAT_TOP]
+                    roi = gray[y : y + height, x : x + width]
+
+                    if roi.size > 0:
+                        # Проверяем несколько характеристик области
+                        std = float(np.std(np.asarray(roi, dtype=np.float64)))  # Контрастность
+                        mean = float(np.mean(roi))  # Средняя яркость
+                        edges_roi = edges[y : y + height, x : x + width]
+                        edge_density = float(np.sum(edges_roi)) / area  # Плотность краев
+
+                        # Ослабляем критерии проверки
+                        if (
+                            std > 10  # Ещё меньше порог контрастности
+                            and (mean < 245 or mean > 15)  # Расширяем диапазон яркости
+                            and edge_density > 0.02  # Меньше плотность краев
+                        ):
+                            center_x = int(centroids[i][0])
+                            center_y = int(centroids[i][1])
+                            clickable_regions.append((center_x, center_y))
+
+        # Удаляем слишком близкие точки
+        filtered_regions: list[tuple[int, int]] = []
+        min_distance = 18  # Уменьшаем минимальное расстояние между точками
+
+        for x1, y1 in clickable_regions:
+            too_close = False
+            for x2, y2 in filtered_regions:
+                distance = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+                if distance < min_distance:
+                    too_close = True
+                    break
+            if not too_close:
+                filtered_regions.append((x1, y1))
+
+        clickable_regions = filtered_regions
+
+        # Если нашли слишком много регионов, фильтруем по контрастности
+        if len(clickable_regions) > self.max_regions_count:
+
+            def get_region_contrast(region: tuple[int, int]) -> float:
+                x, y = region
+                region_size = 15  # Увеличиваем размер области
+                x1, y1 = max(0, x - region_size), max(0, y - region_size)
+                x2, y2 = (
+                    min(gray.shape[1], x + region_size),
+                    min(gray.shape[0], y + region_size),
+                )
+                region_pixels = gray[y1:y2, x1:x2]
+                if region_pixels.size == 0:
+                    return 0.0
+                return float(np.std(np.asarray(region_pixels, dtype=np.float64)))
+
+            clickable_regions.sort(key=get_region_contrast, reverse=True)
+            clickable_regions = clickable_regions[: self.max_regions_count]
+
+        # Если нашли слишком мало регионов, добавляем сетку
+        if len(clickable_regions) < self.min_regions_count:
+            grid_points = self._generate_grid_points(frame_width, frame_height)
+            clickable_regions.extend(grid_points)
+
+        logger.debug(f"Found {len(clickable_regions)} clickable regions")
+        return clickable_regions
+
     def _generate_grid_points(
         self,
         width: int,
@@ -1,17 +1,25 @@
 import os
 import sys
+from datetime import datetime
 
+from loguru import logger
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication, QMenu, QSystemTrayIcon
 from PyQt6.QtCore import QObject
 
+from vimouse.analysis_worker import AnalysisWorker
+from vimouse.key_hook import KeyHook
 from vimouse.keyboard_handler import KeyboardHandler
 from vimouse.mouse_controller import MouseController
 from vimouse.overlay import OverlayWindow
+from vimouse.profiles import ProfileStore
+from vimouse.recorder import InputRecorder
+from vimouse.screen_analyzer import ScreenAnalyzer
+from vimouse.window_info import WindowInfoProvider
 
 
 class ViMouse(QObject):
-    def __init__(self) -> None:
+    def __init__(self, use_analysis_worker: bool = True) -> None:
         super().__init__()
         self.app = QApplication(sys.argv)
 
@@ -20,9 +28,35 @@ class ViMouse(QObject):
         self.app_icon = QIcon(icon_path)
         self.app.setWindowIcon(self.app_icon)
 
-        self.overlay = OverlayWindow()
-        self.mouse = MouseController()
-        self.keyboard_handler = KeyboardHandler(self.overlay, self.mouse)
+        # Бортовой самописец: события ввода пишутся в кольцевой буфер
+        self.recorder = InputRecorder()
+
+        # Процесс-анализатор запускается заранее, чтобы активация не ждала его старта
+        self.analysis_worker: AnalysisWorker | None = None
+        if use_analysis_worker:
+            self.analysis_worker = AnalysisWorker()
+            self.analysis_worker.start()
+
+        # Профили обнаружения по приложениям, кэш раскладок хранится рядом с логом
+        profiles_path = os.path.join(
+            os.path.dirname(os.path.dirname(__file__)),
+            'vimouse_profiles.json',
+        )
+        self.profiles = ProfileStore(profiles_path)
+        self.screen_analyzer = ScreenAnalyzer(
+            self.recorder,
+            self.analysis_worker,
+            self.profiles,
+            WindowInfoProvider(),
+        )
+
+        self.overlay = OverlayWindow(self.recorder, self.screen_analyzer)
+        self.mouse = MouseController(self.recorder)
+        self.keyboard_handler = KeyboardHandler(self.overlay, self.mouse, self.recorder)
+
+        # Хук клавиатуры дополнительно записывает фронты клавиш независимо от опроса;
+        # включается только из меню, так как видит клавиатуру во всей системе
+        self.key_hook = KeyHook(self.recorder, lambda: self.overlay.is_visible)
 
         # Создаем иконку в трее
         self.tray = QSystemTrayIcon(self.app)
@@ -31,6 +65,16 @@ class ViMouse(QObject):
 
         # Создаем контекстное меню
         self.tray_menu = QMenu()
+        dump_action = self.tray_menu.addAction('Сохранить запись ввода')
+        dump_action.triggered.connect(self.dump_recording)
+        frames_action = self.tray_menu.addAction('Записывать кадры экрана')
+        frames_action.setCheckable(True)
+        frames_action.setChecked(self.recorder.record_frames)
+        frames_action.toggled.connect(self.set_record_frames)
+        hook_action = self.tray_menu.addAction('Записывать нажатия через хук клавиатуры')
+        hook_action.setCheckable(True)
+        hook_action.setChecked(self.key_hook.running)
+        hook_action.toggled.connect(self.set_key_hook)
         exit_action = self.tray_menu.addAction('Выход')
         exit_action.triggered.connect(self.cleanup)
 
@@ -45,11 +89,33 @@ class ViMouse(QObject):
         else:
             self.overlay.show()
 
+    def set_record_frames(self, enabled: bool) -> None:
+        """Включает или выключает запись кадров экрана для воспроизведения анализа."""
+        self.recorder.record_frames = enabled
+        logger.info(f"Frame recording {'enabled' if enabled else 'disabled'}")
+
+    def set_key_hook(self, enabled: bool) -> None:
+        """Включает или выключает запись нажатий через хук клавиатуры."""
+        if enabled:
+            self.key_hook.start()
+        else:
+            self.key_hook.stop()
+        logger.info(f"Keyboard hook recording {'enabled' if enabled else 'disabled'}")
+
+    def dump_recording(self) -> str:
+        """Сохраняет запись ввода рядом с логом и возвращает путь к файлу."""
+        name = f"vimouse_record_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), name)
+        self.recorder.dump(path)
+        logger.info(f"Input recording saved to {path}")
+        return path
+
     def run(self) -> None:
         """Запускает основной цикл приложения."""
         print("ViMouse запущен!")
         print("\nДоступные команды:")
         print("  Alt + \\ - показать/скрыть оверлей для перемещения курсора")
+        print("  Alt + ] - показать/скрыть оверлей только для активного окна")
         print("  Alt + K - прокрутка вверх")
         print("  Alt + J - прокрутка вниз")
         print("  Alt + Q - выход из программы")
@@ -58,6 +124,10 @@ class ViMouse(QObject):
 
     def cleanup(self) -> None:
         """Освобождает ресурсы перед выходом."""
+        if self.analysis_worker is not None:
+            self.analysis_worker.stop()
+        self.profiles.flush()
+        self.key_hook.stop()
         self.keyboard_handler.quit_app()
         self.tray.hide()
         self.app.quit()
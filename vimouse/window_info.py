@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class WindowInfo:
+    hwnd: int
+    class_name: str
+    process_name: str
+    rect: tuple[int, int, int, int]  # left, top, right, bottom
+
+    @property
+    def app_keys(self) -> tuple[str, ...]:
+        """
+        Ключи для выбора профиля в порядке приоритета: класс окна
+        (например, стандартный диалог "#32770"), затем имя процесса.
+        """
+        return tuple(key.lower() for key in (self.class_name, self.process_name) if key)
+
+
+class WindowInfoProvider:
+    """
+    Источник сведений об активном окне (через Win32 API).
+    Модули Win32 импортируются при вызове, чтобы WindowInfo и подменный
+    источник можно было использовать в тестах без Windows.
+    """
+
+    def get_foreground(self) -> WindowInfo | None:
+        """Возвращает сведения об активном окне или None."""
+        import win32gui
+
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            if not hwnd:
+                return None
+            class_name = win32gui.GetClassName(hwnd)
+            rect = win32gui.GetWindowRect(hwnd)
+            return WindowInfo(hwnd, class_name, self._get_process_name(hwnd), rect)
+        except Exception as e:
+            logger.error(f"Error getting foreground window: {e}")
+            return None
+
+    def _get_process_name(self, hwnd: int) -> str:
+        """Возвращает имя исполняемого файла процесса окна."""
+        import win32api
+        import win32con
+        import win32process
+
+        handle = None
+        try:
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            handle = win32api.OpenProcess(
+                win32con.PROCESS_QUERY_LIMITED_INFORMATION,
+                False,  # noqa: FBT003
+                pid,
+            )
+            return os.path.basename(win32process.GetModuleFileNameEx(handle, 0))
+        except Exception:
+            # Нет доступа к процессу (например, запущен от администратора)
+            return ""
+        finally:
+            if handle:
+                win32api.CloseHandle(handle)
+
+
+class FakeWindowInfoProvider(WindowInfoProvider):
+    """Подменный источник для тестов и воспроизведения: возвращает заданное окно."""
+
+    def __init__(self, info: WindowInfo | None = None) -> None:
+        self.info = info
+
+    def get_foreground(self) -> WindowInfo | None:
+        return self.info